@@ -0,0 +1,8 @@
+"""Threshold-series simulations: run modules from the repository root with `python -m scripts.<module>`.
+
+Compute modules (recurrence, kernels, series_validation, complex_breathing,
+continuum, threshold, ...) import only NumPy; numba is loaded on the first
+compiled call, and matplotlib, pandas and scipy only inside the plotting and
+DataFrame functions that need them. Nothing is imported here, so a spawned
+worker loads just the modules its task reaches.
+"""
@@ -0,0 +1,186 @@
+import math
+import numpy as np
+from typing import List, Sequence
+
+from .grid_tables import baseline_term
+from .kernels import USER, get_kernel
+from .recurrence import DEFAULT_BLOCK, run_recurrence
+
+
+# Limits of convergent series from partial sums S_k after N_k = N / 2^(K-1-k)
+# terms. The remainder of the memory-free baseline is its integral tail
+#   T(X) = int_X^inf x^-alpha (ln x)^-beta dx,
+# and with memory the remainder is f(S) T + O(T^2), so "richardson" fits
+# S_k = S + sum_j c_j T_k^j (an E-algorithm with the exact tail shape). "levin"
+# (Levin u) and "wynn" (Shanks / Wynn epsilon) use only the sums. Wynn suits
+# alpha > 1, where the remainder shrinks geometrically in k; at alpha = 1 it
+# decays like (ln N)^(1 - beta), where only richardson does well.
+METHODS = ("richardson", "levin", "wynn")
+_LAGUERRE = np.polynomial.laguerre.laggauss(64)
+
+
+def baseline_tail(X: float, alpha: float, beta: float) -> float:
+    """int_X^inf x^-alpha (ln x)^-beta dx for X > 1 (inf where the baseline diverges)."""
+    U = math.log(X)
+    c = alpha - 1.0
+    if c < 0.0 or (c == 0.0 and beta <= 1.0):
+        return math.inf
+    if c == 0.0:
+        return U ** (1.0 - beta) / (beta - 1.0)
+    # u = U + s / c turns it into (e^{-cU} / c) int_0^inf e^{-s} (U + s / c)^-beta ds
+    s, w = _LAGUERRE
+    return math.exp(-c * U) / c * float(np.dot(w, (U + s / c) ** -beta))
+
+
+def geometric_sizes(N: int, first: int = 1024) -> List[int]:
+    """N, N/2, N/4, ... down to `first` terms, ascending."""
+    sizes = []
+    while N >= first and N not in sizes:
+        sizes.append(N)
+        N //= 2
+    return sizes[::-1]
+
+
+class PartialSums:
+    """M after each of `sizes` terms, captured from consecutive (a, M) blocks."""
+
+    def __init__(self, sizes: Sequence[int], shape: tuple = ()):
+        self.sizes = list(sizes)
+        self.values = np.full(shape + (len(self.sizes),), np.nan)
+        self.offset = 0
+
+    def update(self, a: np.ndarray, M: np.ndarray):
+        stop = self.offset + M.shape[-1]
+        for k, size in enumerate(self.sizes):
+            if self.offset < size <= stop:
+                self.values[..., k] = M[..., size - 1 - self.offset]
+        self.offset = stop
+
+
+def _best(estimates: List[float]) -> tuple:
+    # The estimate whose change from the previous one is smallest, that change as its error
+    if len(estimates) < 2:
+        return (estimates[-1] if estimates else math.nan), math.inf
+    diffs = [abs(estimates[i] - estimates[i - 1]) for i in range(1, len(estimates))]
+    i = int(np.argmin(diffs))
+    return estimates[i + 1], diffs[i]
+
+
+def richardson(S: np.ndarray, T: np.ndarray, order: int = 4) -> tuple:
+    estimates = [float(S[-1])]
+    for m in range(1, min(order, len(S) - 1) + 1):
+        t = T[-(m + 1):] / T[-1]
+        A = np.column_stack([np.ones(m + 1)] + [t ** j for j in range(1, m + 1)])
+        estimates.append(float(np.linalg.solve(A, S[-(m + 1):])[0]))
+    return _best(estimates)
+
+
+def levin_u(S: np.ndarray) -> tuple:
+    terms = np.diff(S, prepend=0.0)
+    if np.any(terms == 0):
+        return float(S[-1]), 0.0
+    estimates = []
+    for k in range(1, len(S)):
+        j = np.arange(k + 1)
+        n = len(S) - 1 - k
+        omega = (n + j + 1) * terms[n + j]
+        c = (-1.0) ** j * np.array([math.comb(k, i) for i in j]) * ((n + j + 1) / (n + k + 1)) ** (k - 1) / omega
+        estimates.append(float(np.dot(c, S[n + j]) / c.sum()))
+    return _best(estimates)
+
+
+def wynn_epsilon(S: np.ndarray) -> tuple:
+    prev = np.zeros(len(S) + 1)
+    cur = np.asarray(S, dtype=float)
+    estimates = [float(cur[-1])]
+    col = 0
+    while len(cur) > 1:
+        d = np.diff(cur)
+        if np.any(d == 0):
+            break
+        prev, cur = cur, prev[1:len(cur)] + 1.0 / d
+        col += 1
+        if col % 2 == 0:
+            estimates.append(float(cur[-1]))
+    return _best(estimates)
+
+
+def extrapolate(sizes: Sequence[int],
+                S: Sequence[float],
+                alpha: float,
+                beta: float,
+                lam: float,
+                rho: float,
+                method: str = "richardson",
+                kernel="exp",
+                kappa: float = 1.0) -> dict:
+    """Limit of the series from partial sums S after `sizes` terms.
+
+    limit_err is the last change in the accelerated estimate. limit_lo and
+    limit_hi bracket the limit with the baseline integral tail: the terms
+    after the last sum lie between b_n f(upper bound of M) and b_n for the
+    built-in (decreasing, f(0) = 1) kernels; NaN for user kernels. limit is
+    kept inside the bracket. Divergent baselines give an infinite limit.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown extrapolation {method!r}; expected one of {METHODS}")
+    S = np.asarray(S, dtype=float)
+    N = sizes[-1]
+    # The N-term sum ends at n = N + 1
+    hi_tail = baseline_tail(N + 1.0, alpha, beta)
+    if math.isinf(hi_tail):
+        return {"limit": math.inf, "limit_err": math.nan, "limit_lo": float(S[-1]), "limit_hi": math.inf}
+    if method == "richardson":
+        T = np.array([baseline_tail(n + 1.5, alpha, beta) for n in sizes])
+        limit, err = richardson(S, T)
+    elif method == "levin":
+        limit, err = levin_u(S)
+    else:
+        limit, err = wynn_epsilon(S)
+    kern = get_kernel(kernel)
+    lo = hi = math.nan
+    if kern.kind != USER and alpha * math.log(N + 1.0) + beta > 0:
+        hi = float(S[-1]) + hi_tail
+        f_hi = float(kern.f(np.array([hi]), lam, rho, kappa)[0])
+        lo = float(S[-1]) + f_hi * baseline_tail(N + 2.0, alpha, beta)
+        if not lo <= limit <= hi:
+            clipped = min(max(limit, lo), hi)
+            err = max(err, abs(limit - clipped))
+            limit = clipped
+    return {"limit": limit, "limit_err": err, "limit_lo": lo, "limit_hi": hi}
+
+
+def series_limit(alpha: float,
+                 beta: float,
+                 lam: float,
+                 rho: float,
+                 rtol: float = 1e-8,
+                 method: str = "richardson",
+                 first: int = 1024,
+                 N_max: int = 1 << 30,
+                 mode: str = "auto",
+                 kernel="exp",
+                 kappa: float = 1.0) -> dict:
+    """Extrapolated limit, doubling the number of terms until limit_err <= rtol * |limit|.
+
+    The series is streamed once; every doubling only adds the new terms.
+    The result also holds N, the number of terms summed.
+    """
+    sizes, sums = [], []
+    accum = 0.0
+    done = 0
+    out = {}
+    while done < N_max:
+        stop = min(N_max, max(first, 2 * done))
+        for start in range(done, stop, DEFAULT_BLOCK):
+            n = np.arange(start + 2, min(stop, start + DEFAULT_BLOCK) + 2, dtype=float)
+            _, M = run_recurrence(baseline_term(n, alpha, beta, share=False), lam, rho, M0=accum, mode=mode,
+                                  kernel=kernel, kappa=kappa)
+            accum = float(M[-1])
+        done = stop
+        sizes.append(done)
+        sums.append(accum)
+        out = extrapolate(sizes, sums, alpha, beta, lam, rho, method, kernel, kappa)
+        if len(sizes) > 2 and (math.isinf(out["limit"]) or out["limit_err"] <= rtol * abs(out["limit"])):
+            break
+    return {**out, "N": done}
@@ -0,0 +1,101 @@
+import math
+from functools import partial
+
+from .instrument import record_counts
+from .series_validation import classify_points
+from .sweep_executor import run_sweep, write_csv
+
+
+def _needs_refinement(corners: list, value: str, tol: float, span: float) -> bool:
+    # Split a cell when the theoretical label flips across it, or when
+    # `value` changes by more than tol of its global range between corners
+    if len({r["classification"] for r in corners}) > 1:
+        return True
+    vals = [r[value] for r in corners]
+    return span > 0 and (max(vals) - min(vals)) > tol * span
+
+
+def adaptive_sweep(N: int,
+                   alpha_center: float = 1.0,
+                   beta_center: float = 1.0,
+                   delta: float = 0.02,
+                   base_steps: int = 5,
+                   max_level: int = 4,
+                   value: str = "windowed_growth",
+                   tol: float = 0.1,
+                   lam: float = 1e-4,
+                   rho: float = 1.0,
+                   csv_path: str | None = "figures/critical_sweep_adaptive.csv",
+                   workers: int = 1,
+                   window: int = 10000) -> list:
+    """Quadtree refinement of sweep_alpha_beta's square around the boundary.
+
+    Starts from a base_steps x base_steps grid and splits cells (see
+    _needs_refinement) down to max_level halvings, i.e. the resolution of a
+    uniform grid with (base_steps - 1) * 2**max_level + 1 points per axis.
+    Each level's new corners are classified in one batched run_sweep call.
+    Rows have the critical_sweep.csv layout, sorted by (alpha, beta). The
+    number of classified points and of the equivalent uniform grid go to the
+    active RunRecorder's counts.
+
+    Refinement only pays off from max_level = 3. Around the critical point
+    the boundary crosses most coarse cells, so with the other defaults,
+    levels 1 and 2 classify (nearly) every point of the uniform grid (81
+    and 277-289 of 289, depending on N). At N = 2e5, levels 3, 4 and 5
+    classify about 350 of 1089, 480 of 4225 and 740 of 16641.
+    """
+    fine = 2 ** max_level
+    size = (base_steps - 1) * fine
+    a0 = alpha_center - delta
+    b0 = beta_center - delta
+    rows = {}
+
+    def evaluate(keys):
+        keys = [k for k in dict.fromkeys(keys) if k not in rows]
+        if not keys:
+            return
+        points = [{"N": N,
+                   "alpha": a0 + 2 * delta * i / size,
+                   "beta": b0 + 2 * delta * j / size,
+                   "lam": float(lam),
+                   "rho": float(rho)} for i, j in keys]
+        chunk = len(points) if workers <= 1 else math.ceil(len(points) / workers)
+        sweep = run_sweep(partial(classify_points, window=window), points, workers=workers, chunk_size=chunk)
+        for key, row in zip(keys, sweep):
+            rows[key] = row
+
+    def corners(cell, step):
+        i, j = cell
+        return [(i, j), (i + step, j), (i, j + step), (i + step, j + step)]
+
+    step = fine
+    cells = [(i * fine, j * fine) for i in range(base_steps - 1) for j in range(base_steps - 1)]
+    evaluate([(i * fine, j * fine) for i in range(base_steps) for j in range(base_steps)])
+    while step > 1 and cells:
+        vals = [r[value] for r in rows.values()]
+        span = max(vals) - min(vals)
+        split = [c for c in cells
+                 if _needs_refinement([rows[k] for k in corners(c, step)], value, tol, span)]
+        step //= 2
+        cells = [(i + di, j + dj) for i, j in split for di in (0, step) for dj in (0, step)]
+        evaluate([k for c in cells for k in corners(c, step)])
+
+    results = sorted(rows.values(), key=lambda r: (r["alpha"], r["beta"]))
+    record_counts(classify_calls=len(results), uniform_equivalent=(size + 1) ** 2)
+    if csv_path:
+        write_csv(csv_path, results)
+    return results
+
+
+if __name__ == "__main__":
+    import os
+    from .instrument import RunRecorder
+    from .plot_critical_sweep import heatmap_from_scattered_csv
+
+    csv = "figures/critical_sweep_adaptive.csv"
+    params = {"N": 800000, "csv_path": csv, "workers": os.cpu_count() or 1}
+    with RunRecorder("adaptive_sweep", params, outputs=[csv]) as rec:
+        adaptive_sweep(**params)
+    print(rec.counts)
+    for col in ("windowed_growth", "tail_mean"):
+        heatmap_from_scattered_csv(csv, col, f"figures/critical_adaptive_heatmap_{col}.png")
@@ -0,0 +1,92 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import numpy as np
+from typing import Dict, Tuple
+
+
+# A series artifact is a directory holding one .npy file per column plus
+# header.json (parameters, length, column dtypes). The header is written
+# last, so a directory without one is an unfinished write.
+HEADER = "header.json"
+
+
+def source_version(*objs) -> str:
+    """Short hash of the source files defining objs (functions or modules)."""
+    h = hashlib.sha1()
+    for obj in objs:
+        with open(inspect.getsourcefile(obj), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:12]
+
+
+def _column_path(path: str, name: str) -> str:
+    return os.path.join(path, name + ".npy")
+
+
+def read_header(path: str) -> dict:
+    with open(os.path.join(path, HEADER), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def has_artifact(path: str) -> bool:
+    return os.path.exists(os.path.join(path, HEADER))
+
+
+def open_artifact(path: str) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """Header and read-only memory maps of every column; nothing is read until sliced."""
+    header = read_header(path)
+    columns = {name: np.load(_column_path(path, name), mmap_mode="r") for name in header["columns"]}
+    return header, columns
+
+
+class ArtifactWriter:
+    """Preallocated memory-mapped columns filled block by block.
+
+    Writes go to a sibling temp directory; commit() adds the header and swaps
+    it in whole, so readers never see a half-written artifact.
+    """
+
+    def __init__(self, path: str, length: int, dtypes: Dict[str, np.dtype], meta: dict):
+        self.path = path
+        self.tmp = f"{path}.tmp-{os.getpid()}"
+        self.length = length
+        self.meta = meta
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        os.makedirs(self.tmp)
+        self.columns = {
+            name: np.lib.format.open_memmap(_column_path(self.tmp, name), mode="w+",
+                                            dtype=np.dtype(dt), shape=(length,))
+            for name, dt in dtypes.items()
+        }
+
+    def write(self, start: int, block: Dict[str, np.ndarray]):
+        for name, values in block.items():
+            self.columns[name][start:start + len(values)] = values
+
+    def commit(self) -> str:
+        header = dict(self.meta,
+                      length=self.length,
+                      columns={name: col.dtype.str for name, col in self.columns.items()})
+        for col in self.columns.values():
+            col.flush()
+        self.columns = {}
+        with open(os.path.join(self.tmp, HEADER), "w", encoding="utf-8") as f:
+            json.dump(header, f, indent=2, default=float)
+        old = None
+        if os.path.exists(self.path):
+            old = f"{self.path}.old-{os.getpid()}"
+            os.replace(self.path, old)
+        os.replace(self.tmp, self.path)
+        if old:
+            shutil.rmtree(old, ignore_errors=True)
+        return self.path
+
+
+def write_artifact(path: str, columns: Dict[str, np.ndarray], meta: dict) -> str:
+    length = len(next(iter(columns.values())))
+    writer = ArtifactWriter(path, length, {name: col.dtype for name, col in columns.items()}, meta)
+    writer.write(0, columns)
+    return writer.commit()
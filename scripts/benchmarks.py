@@ -0,0 +1,269 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+from .checkpoints import CheckpointedSeries
+from .complex_breathing import breathing_metrics, complex_series
+from .complex_grid import scan_grid
+from .cosmology_memory import H_series
+from .instrument import run_metadata
+from .critical_sweep import sweep_alpha_beta
+from .neural_thresholds import ltp_response
+from .ode_check import integrate_ode
+from .series_validation import classify, classify_batch, memory_weighted_blocks, memory_weighted_series
+from .thermo_entropy import entropy_series
+from . import recurrence
+from . import series_cache
+
+
+SIZES = (10_000, 1_000_000, 10_000_000)
+CHECK_N = 20_000
+PRECISION_N = 200_000
+P = dict(alpha=1.0, beta=1.0, lam=1e-4, rho=1.0)
+CX = dict(alpha_r=1.0, beta_r=1.0, alpha_i=2.8, beta_i=2.9, lam=1e-4, rho=1.0)
+
+
+def _quiet(fn):
+    def run(*args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn(*args, **kwargs)
+    return run
+
+
+def _breathing_case(N):
+    n, a, phase, M = complex_series(N, **CX)
+    return lambda: breathing_metrics(a, n)
+
+
+# name -> (setup(N) returning a zero-argument callable, terms per N, largest N)
+CASES = {
+    "memory_weighted_series": (lambda N: lambda: memory_weighted_series(N, **P), 1, None),
+    "complex_series": (lambda N: lambda: complex_series(N, **CX), 1, None),
+    "H_series": (lambda N: lambda: H_series(N, **P), 1, None),
+    "ltp_response": (lambda N: lambda: ltp_response(N, 1.0, 1.0, 1e-3, 1.0), 1, None),
+    "entropy_series": (lambda N: lambda: entropy_series(N, **P), 1, None),
+    "memory_weighted_series[rational]": (lambda N: lambda: memory_weighted_series(N, **P, kernel="rational",
+                                                                                kappa=0.5), 1, None),
+    "memory_weighted_series[logistic]": (lambda N: lambda: memory_weighted_series(N, **P, kernel="logistic",
+                                                                                kappa=3.0), 1, None),
+    "memory_weighted_series[float32]": (lambda N: lambda: memory_weighted_series(N, **P, precision="float32"),
+                                        1, None),
+    "complex_series[float32]": (lambda N: lambda: complex_series(N, **CX, precision="float32"), 1, None),
+    # The extended-precision reference is a per-element Python loop
+    "memory_weighted_series[longdouble]": (lambda N: lambda: memory_weighted_series(N, **P, precision="longdouble"),
+                                           1, 100_000),
+    # Pure-Python fixed-step RK4: only the small size is practical
+    "integrate_ode": (lambda N: lambda: integrate_ode(N, 1.0, 1.0, 1e-4, 1.0), 1, 100_000),
+    "breathing_metrics": (_breathing_case, 1, None),
+    "classify": (lambda N: lambda: classify(N, **P), 1, None),
+    "sweep_alpha_beta_3x3": (lambda N: lambda: _quiet(sweep_alpha_beta)(N, steps=3, csv_path=None), 9, None),
+    "scan_grid_3x3": (lambda N: lambda: scan_grid(N=N, steps=3), 9, None),
+}
+
+
+def _rel_err(x, y) -> float:
+    x = np.asarray(x)
+    y = np.asarray(y)
+    scale = np.maximum(np.abs(x), np.finfo(float).tiny)
+    return float(np.max(np.abs(x - y) / scale))
+
+
+def _row_err(r1: list, r2: list, keys=("sum", "windowed_growth", "tail_mean")) -> float:
+    return max(_rel_err(a[k], b[k]) for a, b in zip(r1, r2) for k in keys)
+
+
+def equivalence_checks(N: int = CHECK_N, rtol: float = 1e-12) -> list:
+    """Compare every fast path with the original per-element loops."""
+    modes = [m for m in ("numba", "numpy") if m != "numba" or recurrence.HAVE_NUMBA]
+    checks = []
+
+    def add(name, err, tol=rtol):
+        checks.append({"name": name, "max_rel_err": err, "tol": tol, "ok": bool(err <= tol)})
+
+    ref = memory_weighted_series(N, 0.9, 0.0, 1e-3, 0.5, mode="reference")
+    for m in modes:
+        add(f"memory_weighted_series[{m}]",
+            _rel_err(ref[2], memory_weighted_series(N, 0.9, 0.0, 1e-3, 0.5, mode=m)[2]))
+    ref_cx = complex_series(N, **CX, mode="reference")
+    for m in modes:
+        out = complex_series(N, **CX, mode=m)
+        add(f"complex_series[{m}]", max(_rel_err(ref_cx[1], out[1]), _rel_err(ref_cx[3], out[3])))
+    for name, fn, key in (("H_series", lambda m: H_series(N, **P, mode=m), None),
+                          ("ltp_response", lambda m: ltp_response(N, 1.0, 1.0, 1e-3, 1.0, mode=m), "W"),
+                          ("entropy_series", lambda m: entropy_series(N, **P, mode=m), "S")):
+        base = fn("reference")
+        for m in modes:
+            out = fn(m)
+            add(f"{name}[{m}]", _rel_err(base if key is None else base[key], out if key is None else out[key]))
+    for kernel, kappa in (("rational", 0.5), ("logistic", 3.0)):
+        for lam, rho in ((1e-4, 1.0), (1e-2, 0.5), (1.0, 2.0)):
+            base = memory_weighted_series(N, 1.0, 1.0, lam, rho, mode="reference", kernel=kernel, kappa=kappa)
+            for m in modes:
+                out = memory_weighted_series(N, 1.0, 1.0, lam, rho, mode=m, kernel=kernel, kappa=kappa)
+                add(f"memory_weighted_series[{kernel},lam={lam},rho={rho},{m}]", _rel_err(base[1], out[1]))
+    # float32 keeps M to float64 accuracy; a is rounded to float32 (2^-24 relative)
+    ref = memory_weighted_series(N, **P, mode="reference")
+    for m in modes:
+        out = memory_weighted_series(N, **P, mode=m, precision="float32")
+        add(f"memory_weighted_series[float32,{m}]", _rel_err(ref[2], out[2]))
+        add(f"memory_weighted_series[float32,{m}].a", _rel_err(ref[1], out[1]), tol=1e-7)
+    n, a, M = memory_weighted_series(N, **P, mode="reference")
+    blocks = list(memory_weighted_blocks(N, **P, block=3000))
+    add("memory_weighted_blocks", _rel_err(M, np.concatenate([blk[2] for blk in blocks])))
+    idx = np.unique(np.linspace(2, N + 1, 257).astype(np.int64))
+    add("CheckpointedSeries.at", _rel_err(M[idx - 2], CheckpointedSeries(**P, K=1000, cache=False).at(idx)))
+    alphas = np.array([0.98, 1.0, 1.02])
+    betas = np.array([0.98, 1.0, 1.02])
+    A, B = np.meshgrid(alphas, betas, indexing="ij")
+    loop_rows = [classify(N, x, y, 1e-4, 1.0, mode="reference") for x, y in zip(A.ravel(), B.ravel())]
+    for m in modes:
+        add(f"classify_batch[{m}]", _row_err(loop_rows, classify_batch(N, A, B, 1e-4, 1.0, mode=m)))
+    add("classify[streamed]", _row_err(loop_rows, [classify(N, x, y, 1e-4, 1.0, block=4099)
+                                                   for x, y in zip(A.ravel(), B.ravel())]))
+    d_loop = scan_grid(N=N, steps=3, batched=False)
+    d_batch = scan_grid(N=N, steps=3)
+    add("scan_grid[batched]", max(_rel_err(d_loop[c], d_batch[c])
+                                  for c in ("residence", "amplitude_std", "mean_mag")))
+    # The streaming metrics read a quantile sketch with rel_err = 1e-3
+    d_stream = scan_grid(N=N, steps=3, streaming=True)
+    add("scan_grid[streaming]", max(_rel_err(d_loop[c], d_stream[c])
+                                    for c in ("residence", "amplitude_std", "mean_mag")), tol=2e-3)
+    # Cache: a cold fill of half the series followed by a prefix extension
+    saved = series_cache.CACHE_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        series_cache.CACHE_DIR = tmp
+        try:
+            complex_series(N // 2, **CX, cache=True)
+            out = complex_series(N, **CX, cache=True)
+            add("complex_series[cache]", max(_rel_err(ref_cx[1], out[1]), _rel_err(ref_cx[3], out[3])))
+            del out
+        finally:
+            series_cache.CACHE_DIR = saved
+    # The continuum tail is an approximation; its tolerance is looser
+    Nh = 10 * N
+    exact = classify(Nh, **P)
+    hybrid = classify(Nh, **P, n0=N // 4)
+    add("classify[hybrid]", _row_err([exact], [hybrid]), tol=1e-6)
+    return checks
+
+
+def precision_report(N: int = PRECISION_N, repeat: int = 3) -> list:
+    """Throughput of each precision and its error against the longdouble reference at N terms."""
+    rows = []
+    for name, fn, cols in (("memory_weighted_series", lambda p: memory_weighted_series(N, **P, precision=p), (1, 2)),
+                           ("complex_series", lambda p: complex_series(N, **CX, precision=p), (1, 3))):
+        t0 = time.perf_counter()
+        ref = fn("longdouble")
+        rows.append({"name": f"{name}[longdouble]", "N": N, "terms_per_s": N / (time.perf_counter() - t0)})
+        a_ref, M_ref = (ref[c] for c in cols)
+        for p in ("float64", "float32"):
+            fn(p)  # JIT warm-up
+            out = fn(p)
+            a, M = (out[c] for c in cols)
+            rows.append({
+                "name": f"{name}[{p}]",
+                "N": N,
+                "terms_per_s": N / _time(lambda: fn(p), repeat),
+                "a_bytes_per_term": a.itemsize,
+                "max_rel_err_a": _rel_err(a_ref, a),
+                "max_rel_err_M": _rel_err(M_ref, M),
+                "rel_err_sum": _rel_err(M_ref[-1], M[-1]),
+            })
+            print(rows[-1], flush=True)
+    return rows
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _peak_mb(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(sizes=SIZES, names=None, repeat: int = 3) -> list:
+    results = []
+    for name, (setup, per_n, max_n) in CASES.items():
+        if names and name not in names:
+            continue
+        setup(1000)()  # JIT warm-up
+        for N in sizes:
+            if max_n is not None and N > max_n:
+                results.append({"name": name, "N": N, "skipped": f"N > {max_n}"})
+                continue
+            fn = setup(N)
+            wall = _time(fn, repeat)
+            # Timed and traced runs are separate: tracemalloc slows allocation
+            peak = _peak_mb(fn)
+            results.append({
+                "name": name,
+                "N": N,
+                "wall_s": wall,
+                "terms_per_s": N * per_n / wall,
+                "peak_mb": peak,
+            })
+            print(results[-1], flush=True)
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Cases whose throughput fell by more than `threshold` (a fraction) against baseline."""
+    old = {(r["name"], r["N"]): r for r in baseline["results"] if "terms_per_s" in r}
+    regressions = []
+    for r in current["results"]:
+        prev = old.get((r["name"], r["N"]))
+        if prev is None or "terms_per_s" not in r:
+            continue
+        ratio = r["terms_per_s"] / prev["terms_per_s"]
+        if ratio < 1.0 - threshold:
+            regressions.append({"name": r["name"], "N": r["N"], "ratio": ratio})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the series kernels and check fast paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default="figures/benchmarks.json")
+    parser.add_argument("--compare", default=None, help="earlier JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="fail if terms/sec drops by more than this fraction")
+    parser.add_argument("--skip-checks", action="store_true")
+    parser.add_argument("--precision-N", type=int, default=PRECISION_N,
+                        help="terms for the error of each precision against the longdouble reference (0 skips)")
+    args = parser.parse_args()
+
+    report = {"meta": run_metadata()}
+    report["equivalence"] = [] if args.skip_checks else equivalence_checks()
+    for check in report["equivalence"]:
+        print(check)
+    report["results"] = run_benchmarks(args.sizes, args.cases, args.repeat)
+    report["precision"] = precision_report(args.precision_N, args.repeat) if args.precision_N else []
+    failed = [c for c in report["equivalence"] if not c["ok"]]
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f), args.threshold)
+        failed += report["regressions"]
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print({"saved": args.out, "failures": failed})
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,114 @@
+import numpy as np
+
+from . import series_cache
+from .grid_tables import baseline_term
+from .instrument import stage
+from .kernels import get_kernel
+from .mappings import power_law_events
+from .recurrence import DEFAULT_BLOCK, run_recurrence, run_recurrence_batch
+
+
+class CheckpointedSeries:
+    """Random access to M of one memory-weighted series through stored checkpoints.
+
+    The accumulator is kept after every K terms (checkpoint i holds the sum of
+    the first (i + 1) * K terms), so M at any event index n replays at most
+    K - 1 terms from the checkpoint below it. Checkpoints are computed once,
+    as far as the largest index asked for, and extended on demand; with cache
+    they persist as a series_cache artifact, so repeated calibration runs
+    (other gamma, t0) reuse them. scale multiplies b_n, as stim does in
+    neural_thresholds.
+    """
+
+    def __init__(self,
+                 alpha: float,
+                 beta: float,
+                 lam: float,
+                 rho: float,
+                 K: int = 1 << 16,
+                 scale: float = 1.0,
+                 mode: str = "auto",
+                 kernel="exp",
+                 kappa: float = 1.0,
+                 cache: bool = True,
+                 budget: int = 1 << 22):
+        self.alpha, self.beta, self.lam, self.rho = float(alpha), float(beta), float(lam), float(rho)
+        self.K = int(K)
+        self.scale = float(scale)
+        self.mode = mode
+        self.kernel = get_kernel(kernel)
+        self.kappa = float(kappa)
+        self.cache = cache
+        self.budget = budget
+        self._ck = np.zeros(0)
+
+    @property
+    def params(self) -> dict:
+        return {"alpha": self.alpha, "beta": self.beta, "lam": self.lam, "rho": self.rho, "K": self.K,
+                "scale": self.scale, "kernel": self.kernel.name, "kappa": self.kappa}
+
+    def _b(self, n: np.ndarray) -> np.ndarray:
+        return self.scale * baseline_term(n, self.alpha, self.beta, share=False)
+
+    def _segment(self, lo: int, hi: int, M0: float) -> dict:
+        # Checkpoints lo..hi-1, i.e. terms lo*K .. hi*K - 1 starting from M0
+        K = self.K
+        out = np.empty(hi - lo)
+        step = max(1, DEFAULT_BLOCK // K)
+        for c in range(lo, hi, step):
+            d = min(hi, c + step)
+            n = np.arange(c * K + 2, d * K + 2, dtype=float)
+            with stage("series", terms=len(n)):
+                _, M = run_recurrence(self._b(n), self.lam, self.rho, M0=M0, mode=self.mode,
+                                      kernel=self.kernel, kappa=self.kappa)
+            out[c - lo:d - lo] = M[K - 1::K]
+            M0 = float(M[-1])
+        return {"M": out}
+
+    def checkpoints(self, count: int) -> np.ndarray:
+        """The first `count` checkpoints, computing any that are missing."""
+        if count <= len(self._ck):
+            return self._ck[:count]
+        if self.cache:
+            self._ck = series_cache.cached_series("checkpoints", self.params, count, self._segment)["M"]
+        else:
+            start = len(self._ck)
+            M0 = float(self._ck[-1]) if start else 0.0
+            self._ck = np.concatenate((self._ck, self._segment(start, count, M0)["M"]))
+        return self._ck
+
+    def at(self, n) -> np.ndarray:
+        """M after the term with index n (n >= 2), i.e. memory_weighted_series(...)[2][n - 2]."""
+        n = np.asarray(n, dtype=np.int64)
+        if n.size and n.min() < 2:
+            raise ValueError("event indices start at n = 2")
+        K = self.K
+        terms = n.ravel() - 1
+        ck_idx = terms // K
+        ck = self.checkpoints(int(ck_idx.max()) if terms.size else 0)
+        out = np.where(ck_idx > 0, ck[np.maximum(ck_idx - 1, 0)] if len(ck) else 0.0, 0.0)
+        rest = terms - ck_idx * K
+        # One replay row per distinct checkpoint, as long as its furthest query
+        todo = rest > 0
+        groups, inverse = np.unique(ck_idx[todo], return_inverse=True)
+        if groups.size:
+            width = np.zeros(len(groups), dtype=np.int64)
+            np.maximum.at(width, inverse, rest[todo])
+            sel = np.flatnonzero(todo)
+            rows = max(1, self.budget // K)
+            for g0 in range(0, len(groups), rows):
+                g = groups[g0:g0 + rows]
+                L = int(width[g0:g0 + rows].max())
+                n_grid = g[:, None] * K + 2 + np.arange(L, dtype=float)[None, :]
+                M0 = np.where(g > 0, ck[np.maximum(g - 1, 0)] if len(ck) else 0.0, 0.0)
+                with stage("replay", terms=n_grid.size):
+                    _, M = run_recurrence_batch(self._b(n_grid), self.lam, self.rho, M0=M0, mode=self.mode,
+                                                kernel=self.kernel, kappa=self.kappa)
+                mine = (inverse >= g0) & (inverse < g0 + len(g))
+                q = sel[mine]
+                out[q] = M[inverse[mine] - g0, rest[q] - 1]
+        return out.reshape(n.shape)
+
+    def at_events(self, t: np.ndarray, t0: float = 1.0, gamma: float = 1.0) -> np.ndarray:
+        """M at the event indices mappings.power_law_events(t, t0, gamma)."""
+        return self.at(power_law_events(np.asarray(t, dtype=float), t0, gamma))
@@ -0,0 +1,215 @@
+import argparse
+import os
+import sys
+
+from .result_store import store_path
+from .taskgraph import Task, run_graph, select
+
+
+# Task bodies import their modules lazily: the CLI and its spawned workers only
+# load what the selected tasks need, and each task's code fingerprint covers
+# just the modules it reaches.
+
+def _series_validation(N: int, window: int, workers: int, csv_path: str, kernels: list | None = None,
+                       limit: str | None = None):
+    from .series_validation import validate_regimes
+    validate_regimes(N=N, window=window, workers=workers, csv_path=csv_path, kernels=kernels, limit=limit)
+
+
+def _critical_sweep(N: int, steps: int, delta: float, window: int, workers: int, csv_path: str,
+                    queue_dir: str | None = None):
+    from .critical_sweep import sweep_alpha_beta
+    sweep_alpha_beta(N=N, delta=delta, steps=steps, window=window, workers=workers, csv_path=csv_path,
+                     queue_dir=queue_dir)
+
+
+def _critical_heatmaps(store: str, figdir: str):
+    from .plot_critical_sweep import heatmap_from_csv
+    for col in ("windowed_growth", "tail_mean"):
+        heatmap_from_csv(store, col, os.path.join(figdir, f"critical_heatmap_{col}.png"))
+
+
+def _adaptive_sweep(N: int, delta: float, max_level: int, tol: float, window: int, workers: int,
+                    csv_path: str):
+    from .adaptive_sweep import adaptive_sweep
+    adaptive_sweep(N=N, delta=delta, max_level=max_level, tol=tol, window=window, workers=workers,
+                   csv_path=csv_path)
+
+
+def _adaptive_heatmaps(csv_path: str, figdir: str):
+    from .plot_critical_sweep import heatmap_from_scattered_csv
+    for col in ("windowed_growth", "tail_mean"):
+        heatmap_from_scattered_csv(csv_path, col, os.path.join(figdir, f"critical_adaptive_heatmap_{col}.png"))
+
+
+def _complex_grid(N: int, steps: int, workers: int, csv_path: str, queue_dir: str | None = None,
+                  streaming: bool = False):
+    from .complex_grid import scan_grid
+    scan_grid(N=N, steps=steps, workers=workers, csv_path=csv_path, queue_dir=queue_dir, streaming=streaming)
+
+
+def _complex_grid_heatmaps(store: str, figdir: str):
+    from .complex_grid import heatmap
+    from .result_store import load_table
+    df = load_table(store)
+    heatmap(df, "residence", os.path.join(figdir, "complex_grid_residence.png"))
+    heatmap(df, "amplitude_std", os.path.join(figdir, "complex_grid_amplitude.png"))
+
+
+def _threshold_sweep(phi_c: float, n_max: int, steps: int, delta: float, workers: int, csv_path: str):
+    from .threshold import sweep_threshold
+    sweep_threshold(phi_c=phi_c, n_max=n_max, steps=steps, delta=delta, workers=workers, csv_path=csv_path)
+
+
+def _threshold_heatmap(store: str, figdir: str):
+    from .plot_critical_sweep import heatmap_from_csv
+    heatmap_from_csv(store, "log10_N_c", os.path.join(figdir, "threshold_heatmap_log10_N_c.png"))
+
+
+def _ensemble(samples: int, N: int, seed: int, phi_c: float, window: int, workers: int, csv_path: str):
+    from .ensemble import DEFAULT_PRIORS, run_ensemble
+    run_ensemble(DEFAULT_PRIORS, samples, N, seed=seed, window=window, phi_c=phi_c, workers=workers,
+                 csv_path=csv_path)
+
+
+def _phase_analysis(N: int, fit_window: int, figdir: str):
+    from .phase_analysis import analyze_phase
+    analyze_phase(N=N, fit_window=fit_window, figdir=figdir)
+
+
+def _plot(which: str, N: int, figdir: str):
+    from . import plots
+    getattr(plots, f"plot_{which}")(figdir, N=N)
+
+
+def build_tasks(args) -> list:
+    d = args.figdir
+    fig = lambda name: os.path.join(d, name)
+    sweep_csv = fig("critical_sweep.csv")
+    adaptive_csv = fig("critical_sweep_adaptive.csv")
+    grid_csv = fig("complex_grid.csv")
+    threshold_csv = fig("threshold_sweep.csv")
+    sweep_store, grid_store, threshold_store = (store_path(p) for p in (sweep_csv, grid_csv, threshold_csv))
+    queue = lambda name: os.path.join(args.queue_dir, name) if args.queue_dir else None
+    return [
+        Task("series_validation", _series_validation,
+             {"N": args.validation_N, "window": args.window, "workers": args.workers,
+              "csv_path": fig("series_validation.csv"), "kernels": args.kernels,
+              "limit": args.limit},
+             [fig("series_validation.csv")]),
+        Task("critical_sweep", _critical_sweep,
+             {"N": args.sweep_N, "steps": args.sweep_steps, "delta": args.sweep_delta,
+              "window": args.window, "workers": args.workers, "csv_path": sweep_csv,
+              "queue_dir": queue("critical_sweep")},
+             [sweep_csv, sweep_store]),
+        Task("critical_heatmaps", _critical_heatmaps, {"store": sweep_store, "figdir": d},
+             [fig("critical_heatmap_windowed_growth.png"), fig("critical_heatmap_tail_mean.png")],
+             [sweep_store]),
+        Task("adaptive_sweep", _adaptive_sweep,
+             {"N": args.sweep_N, "delta": args.sweep_delta, "max_level": args.adaptive_levels,
+              "tol": args.adaptive_tol, "window": args.window, "workers": args.workers,
+              "csv_path": adaptive_csv},
+             [adaptive_csv]),
+        Task("adaptive_heatmaps", _adaptive_heatmaps, {"csv_path": adaptive_csv, "figdir": d},
+             [fig("critical_adaptive_heatmap_windowed_growth.png"),
+              fig("critical_adaptive_heatmap_tail_mean.png")],
+             [adaptive_csv]),
+        Task("complex_grid", _complex_grid,
+             {"N": args.grid_N, "steps": args.grid_steps, "workers": args.workers, "csv_path": grid_csv,
+              "queue_dir": queue("complex_grid"), "streaming": args.grid_streaming},
+             [grid_csv, grid_store]),
+        Task("complex_grid_heatmaps", _complex_grid_heatmaps, {"store": grid_store, "figdir": d},
+             [fig("complex_grid_residence.png"), fig("complex_grid_amplitude.png")],
+             [grid_store]),
+        Task("threshold_sweep", _threshold_sweep,
+             {"phi_c": args.phi_c, "n_max": args.threshold_N_max, "steps": args.sweep_steps,
+              "delta": args.sweep_delta, "workers": args.workers, "csv_path": threshold_csv},
+             [threshold_csv, threshold_store]),
+        Task("threshold_heatmap", _threshold_heatmap, {"store": threshold_store, "figdir": d},
+             [fig("threshold_heatmap_log10_N_c.png")],
+             [threshold_store]),
+        Task("ensemble", _ensemble,
+             {"samples": args.ensemble_samples, "N": args.ensemble_N, "seed": args.seed, "phi_c": args.phi_c,
+              "window": args.window, "workers": args.workers, "csv_path": fig("ensemble_summary.csv")},
+             [fig("ensemble_summary.csv")]),
+        Task("phase_analysis", _phase_analysis,
+             {"N": args.phase_N, "fit_window": args.fit_window, "figdir": d},
+             [fig("phase_vs_lnn.png"), fig("phase_slope.png"), fig("complex_series_spectrum.png"),
+              fig("complex_series_logspectrum.png"), fig("phase_fit.txt")]),
+        Task("plot_entropy", _plot, {"which": "entropy", "N": args.entropy_N, "figdir": d},
+             [fig("entropy_S.png")]),
+        Task("plot_cosmology", _plot, {"which": "cosmology", "N": args.plots_N, "figdir": d},
+             [fig("cosmology_H.png")]),
+        Task("plot_complex_breathing", _plot, {"which": "complex_breathing", "N": args.plots_N, "figdir": d},
+             [fig("breathing_magnitude.png"), fig("breathing_spectrum.png")]),
+        Task("plot_neural", _plot, {"which": "neural", "N": args.plots_N, "figdir": d},
+             [fig("awareness_accumulation.png")]),
+    ]
+
+
+def _kernel_spec(text: str) -> tuple:
+    name, _, kappa = text.partition(":")
+    return name, float(kappa) if kappa else 1.0
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(
+        description="Build the figures in figures/ as a task graph; up-to-date outputs are skipped.")
+    p.add_argument("targets", nargs="*", help="task names or output paths (default: everything)")
+    p.add_argument("--figdir", default="figures")
+    p.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                   help="independent tasks run at once")
+    p.add_argument("--workers", type=int, default=1, help="worker processes inside each sweep")
+    p.add_argument("--queue-dir", default=None,
+                   help="run critical_sweep and complex_grid through work queues under this shared directory; "
+                        "other hosts join with `python -m scripts.work_queue worker DIR/<task>`")
+    p.add_argument("--force", action="store_true", help="rebuild even if up to date")
+    p.add_argument("-n", "--dry-run", action="store_true", help="only report what would run")
+    p.add_argument("--list", action="store_true", help="list tasks with their outputs and inputs")
+    g = p.add_argument_group("sizes and windows")
+    g.add_argument("--validation-N", type=int, default=800000)
+    g.add_argument("--sweep-N", type=int, default=800000)
+    g.add_argument("--sweep-steps", type=int, default=9)
+    g.add_argument("--sweep-delta", type=float, default=0.02)
+    g.add_argument("--window", type=int, default=10000, help="windowed_growth / tail_mean window")
+    g.add_argument("--grid-N", type=int, default=60000)
+    g.add_argument("--grid-steps", type=int, default=7)
+    g.add_argument("--grid-streaming", action="store_true",
+                   help="complex_grid metrics from a quantile sketch (bounded memory, ~1e-3 relative error)")
+    g.add_argument("--phi-c", type=float, default=4.0, help="threshold for the N_c(phi_c) sweep")
+    g.add_argument("--threshold-N-max", type=int, default=10**12,
+                   help="N_c search limit; beyond 2^24 terms it runs on the continuum tail")
+    g.add_argument("--ensemble-samples", type=int, default=1024, help="Monte Carlo draws for the ensemble task")
+    g.add_argument("--ensemble-N", type=int, default=200000)
+    g.add_argument("--seed", type=int, default=0, help="ensemble seed; results do not depend on --workers")
+    g.add_argument("--phase-N", type=int, default=300000)
+    g.add_argument("--fit-window", type=int, default=20000)
+    g.add_argument("--entropy-N", type=int, default=150000)
+    g.add_argument("--plots-N", type=int, default=200000)
+    g.add_argument("--kernels", nargs="+", type=_kernel_spec, default=None, metavar="NAME[:KAPPA]",
+                   help="memory kernel families for series_validation, e.g. exp rational:0.5 logistic:3")
+    g.add_argument("--limit", choices=("richardson", "levin", "wynn"), default=None,
+                   help="add the extrapolated infinite sum (limit, limit_err, limit_lo, limit_hi) to series_validation")
+    g = p.add_argument_group("tolerances")
+    g.add_argument("--adaptive-tol", type=float, default=0.1,
+                   help="adaptive sweep splits cells whose value spread exceeds tol x range")
+    g.add_argument("--adaptive-levels", type=int, default=4,
+                   help="refinement halvings; below 3 the adaptive sweep evaluates almost the whole uniform grid")
+    return p.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    tasks = build_tasks(args)
+    if args.list:
+        for t in tasks:
+            print({"task": t.name, "outputs": t.outputs, "inputs": t.inputs})
+        return 0
+    status = run_graph(select(tasks, args.targets), jobs=args.jobs, force=args.force,
+                       dry_run=args.dry_run, figdir=args.figdir)
+    print(status)
+    return 1 if any(s in ("failed", "blocked") for s in status.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,43 @@
 import numpy as np
-from typing import Tuple
+from typing import Iterator, Tuple
 
+from .grid_tables import baseline_term, log_tables
+from .instrument import stage
+from .recurrence import DEFAULT_BLOCK, baseline_dtype, run_recurrence, run_recurrence_batch
+from .series_cache import cached_series
+from .sketch import LogSketch
+from .tangents import tangent_block
 
-def baseline_term(n: np.ndarray, alpha_r: float, beta_r: float) -> np.ndarray:
-    ln_n = np.log(n)
-    ln_n = np.where(ln_n == 0.0, np.finfo(float).tiny, ln_n)
-    return 1.0 / (np.power(n, alpha_r) * np.power(ln_n, beta_r))
 
-
-def f_memory(M: np.ndarray, lam: float, rho: float) -> np.ndarray:
-    return np.exp(-lam * np.power(M, rho))
+def _complex_segment(start: int,
+                     stop: int,
+                     alpha_r: float,
+                     beta_r: float,
+                     alpha_i: float,
+                     beta_i: float,
+                     lam: float,
+                     rho: float,
+                     M0: float = 0.0,
+                     mode: str = "auto",
+                     precision: str = "float64",
+                     share: bool = True) -> dict:
+    # Terms start..stop-1 (n = start+2 .. stop+1) continuing from accumulator M0
+    n = np.arange(start + 2, stop + 2, dtype=float)
+    dtype = baseline_dtype(precision)
+    b = baseline_term(n, alpha_r, beta_r, dtype, share)
+    if dtype is np.longdouble:
+        ln_n = np.log(n.astype(dtype))
+        ln_ln_n = np.log(ln_n)
+    else:
+        ln_n, ln_ln_n = log_tables(n, share)
+    phase = alpha_i * ln_n + beta_i * ln_ln_n
+    # |a_n| = b_n * f(M_n), so the memory accumulates the real magnitudes
+    mag, M_real = run_recurrence(b, lam, rho, M0=M0, mode=mode, precision=precision)
+    if precision == "float32":
+        # complex64 terms; M_real keeps its compensated float64
+        return {"a": (mag * np.exp(-1j * phase)).astype(np.complex64), "phase": phase.astype(np.float32),
+                "M": M_real}
+    return {"a": mag * np.exp(-1j * phase), "phase": phase, "M": M_real}
 
 
 def complex_series(N: int,
@@ -18,20 +46,74 @@ def complex_series(N: int,
                    alpha_i: float,
                    beta_i: float,
                    lam: float,
-                   rho: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+                   rho: float,
+                   mode: str = "auto",
+                   cache: bool = False,
+                   tangents: bool = False,
+                   precision: str = "float64") -> tuple:
+    """(n, a, phase, M); with tangents also {"a": da, "M": dM}, rows ordered as COMPLEX_PARAMS.
+
+    precision is a recurrence.PRECISIONS entry: "float32" gives complex64 a.
+    """
     n = np.arange(2, N + 2, dtype=float)
-    b = baseline_term(n, alpha_r, beta_r)
-    a = np.empty(N, dtype=np.complex128)
-    phase = alpha_i * np.log(n) + beta_i * np.log(np.log(n))
-    M_real = np.empty(N, dtype=float)
-    accum = 0.0
-    for i in range(N):
-        fm = f_memory(np.array([accum]), lam, rho)[0]
-        a_i = b[i] * np.exp(-1j * phase[i]) * fm
-        a[i] = a_i
-        accum += np.abs(a_i)
-        M_real[i] = accum
-    return n, a, phase, M_real
+    params = (alpha_r, beta_r, alpha_i, beta_i, lam, rho)
+    if cache:
+        # Shared across scripts: shorter requests slice, longer ones extend
+        out = cached_series("complex_series",
+                            dict(zip(("alpha_r", "beta_r", "alpha_i", "beta_i", "lam", "rho"), params)),
+                            N,
+                            lambda start, stop, M0: _complex_segment(start, stop, *params, M0=M0, mode=mode,
+                                                                     precision=precision, share=False),
+                            dtype=precision)
+    else:
+        out = _complex_segment(0, N, *params, mode=mode, precision=precision)
+    if tangents:
+        return n, out["a"], out["phase"], out["M"], complex_tangents(n, out["a"], out["M"], lam, rho)
+    return n, out["a"], out["phase"], out["M"]
+
+
+COMPLEX_PARAMS = ("alpha_r", "beta_r", "alpha_i", "beta_i", "lam", "rho")
+
+
+def complex_tangents(n: np.ndarray, a: np.ndarray, M: np.ndarray, lam: float, rho: float) -> dict:
+    """Derivatives of a complex series (from its first term) with respect to COMPLEX_PARAMS.
+
+    The memory only sees |a_n|, so alpha_r, beta_r, lam and rho act through
+    the real recurrence (tangents.tangent_block) and rotate with the phase,
+    while alpha_i and beta_i only turn a_n: da/dalpha_i = -i ln n a_n.
+    """
+    a = np.asarray(a)
+    d_mag, dM_real = tangent_block(n, np.abs(a), M, 0.0, 0.0, lam, rho)
+    unit = a / np.where(a == 0, 1.0, np.abs(a))
+    ln_n, ln_ln_n = log_tables(np.asarray(n, dtype=float))
+    da = np.empty((len(COMPLEX_PARAMS), len(a)), dtype=complex)
+    da[[0, 1, 4, 5]] = d_mag * unit
+    da[2] = -1j * ln_n * a
+    da[3] = -1j * ln_ln_n * a
+    dM = np.zeros((len(COMPLEX_PARAMS), len(a)))
+    dM[[0, 1, 4, 5]] = dM_real
+    return {"a": da, "M": dM}
+
+
+def complex_series_blocks(N: int,
+                          alpha_r: float,
+                          beta_r: float,
+                          alpha_i: float,
+                          beta_i: float,
+                          lam: float,
+                          rho: float,
+                          block: int = DEFAULT_BLOCK,
+                          mode: str = "auto",
+                          precision: str = "float64"
+                          ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """complex_series() as a generator of (n, a, phase, M) blocks."""
+    M0 = 0.0
+    for start in range(0, N, block):
+        stop = min(N, start + block)
+        out = _complex_segment(start, stop, alpha_r, beta_r, alpha_i, beta_i, lam, rho, M0=M0, mode=mode,
+                               precision=precision, share=False)
+        M0 = out["M"][-1]
+        yield np.arange(start + 2, stop + 2, dtype=float), out["a"], out["phase"], out["M"]
 
 
 def breathing_metrics(a: np.ndarray,
@@ -51,15 +133,177 @@ def breathing_metrics(a: np.ndarray,
     }
 
 
+class OnlineBreathing:
+    """breathing_metrics() from blocks of a_n in O(1) memory per configuration.
+
+    |a_n| goes into a LogSketch: the target is its median estimate, within
+    rel_err of the exact median of the positive magnitudes, and residence and
+    amplitude_std are read from the sketch's bucket counts and moments over
+    the window target +- scale_frac * target. Besides the target error, the
+    two buckets straddling the window ends are split by interpolation, which
+    bounds the residence error by their counts (a relative width of 2 rel_err
+    in |a|). Blocks may arrive in any order, and sketches from separate chunks
+    of the same series combine with merge().
+    """
+
+    def __init__(self, shape: tuple = (), scale_frac: float = 0.5, rel_err: float = 1e-3):
+        self.scale_frac = scale_frac
+        self.sketch = LogSketch(shape, rel_err)
+
+    def update(self, a: np.ndarray):
+        self.sketch.update(np.abs(a))
+
+    def merge(self, other: "OnlineBreathing") -> "OnlineBreathing":
+        self.sketch.merge(other.sketch)
+        return self
+
+    def metrics(self) -> np.ndarray:
+        sk = self.sketch
+        target = sk.quantile(0.5, positive=True)
+        tol = self.scale_frac * target
+        count, s1, s2 = sk.window(target - tol, target + tol)
+        residence = np.rint(count).astype(np.int64)
+        shape = sk.shape
+        n = sk.count.reshape(shape)
+        mean_all = sk.total.reshape(shape) / n
+        var_all = sk.total_sq.reshape(shape) / n - mean_all ** 2
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var_near = s2 / count - (s1 / count) ** 2
+        amp = np.sqrt(np.maximum(np.where(residence > 0, var_near, var_all), 0.0))
+        out = np.empty(shape, dtype=object)
+        for idx in np.ndindex(shape):
+            out[idx] = {"residence": int(residence[idx]),
+                        "amplitude_std": float(amp[idx]),
+                        "mean_mag": float(mean_all[idx])}
+        return out
+
+
+def breathing_metrics_stream(blocks: Iterator[tuple],
+                             scale_frac: float = 0.5,
+                             rel_err: float = 1e-3) -> dict:
+    """breathing_metrics() over complex_series_blocks(...) without holding the series."""
+    acc = OnlineBreathing(scale_frac=scale_frac, rel_err=rel_err)
+    for n, a, phase, M in blocks:
+        acc.update(a)
+    return acc.metrics()[()]
+
+
+def _magnitude_batch(n: np.ndarray,
+                     alpha_r: np.ndarray,
+                     beta_r: np.ndarray,
+                     lam: np.ndarray,
+                     rho: np.ndarray,
+                     mode: str = "auto") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # |a_n| and M_n only depend on (alpha_r, beta_r, lam, rho): run the
+    # recurrence once per distinct real configuration and map rows back
+    real = np.stack([alpha_r, beta_r, lam, rho], axis=1)
+    uniq, inv = np.unique(real, axis=0, return_inverse=True)
+    b = baseline_term(n[None, :], uniq[:, 0:1], uniq[:, 1:2])
+    mag, M = run_recurrence_batch(b, uniq[:, 2], uniq[:, 3], mode=mode)
+    return mag, M, np.ravel(inv)
+
+
+def _broadcast_params(*params) -> Tuple[np.ndarray, ...]:
+    return tuple(np.ravel(x).astype(float) for x in np.broadcast_arrays(*params))
+
+
+def complex_series_batch(N: int,
+                         alpha_r,
+                         beta_r,
+                         alpha_i,
+                         beta_i,
+                         lam,
+                         rho,
+                         mode: str = "auto") -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """complex_series() over broadcast parameter arrays; a, phase and M are (K, N)."""
+    alpha_r, beta_r, alpha_i, beta_i, lam, rho = _broadcast_params(
+        alpha_r, beta_r, alpha_i, beta_i, lam, rho)
+    n = np.arange(2, N + 2, dtype=float)
+    ln_n, ln_ln_n = log_tables(n)
+    phase = alpha_i[:, None] * ln_n + beta_i[:, None] * ln_ln_n
+    mag, M, inv = _magnitude_batch(n, alpha_r, beta_r, lam, rho, mode=mode)
+    a = mag[inv] * np.exp(-1j * phase)
+    return n, a, phase, M[inv]
+
+
+def breathing_metrics_batch(N: int,
+                            alpha_r,
+                            beta_r,
+                            alpha_i,
+                            beta_i,
+                            lam,
+                            rho,
+                            scale_frac: float = 0.5,
+                            mode: str = "auto",
+                            streaming: bool = False,
+                            rel_err: float = 1e-3,
+                            block: int = 1 << 16) -> list:
+    """breathing_metrics() for every broadcast configuration without building a_n.
+
+    The metrics only read |a_n|, which does not depend on (alpha_i, beta_i).
+    By default full rows are kept and the metrics are exact. With streaming,
+    |a_n| is produced `block` terms at a time into an OnlineBreathing sketch
+    (relative error rel_err), so memory does not grow with N.
+    """
+    alpha_r, beta_r, alpha_i, beta_i, lam, rho = _broadcast_params(
+        alpha_r, beta_r, alpha_i, beta_i, lam, rho)
+    if not streaming:
+        n = np.arange(2, N + 2, dtype=float)
+        with stage("series", terms=N * len(alpha_r)):
+            mag, _, inv = _magnitude_batch(n, alpha_r, beta_r, lam, rho, mode=mode)
+        with stage("metrics"):
+            per_row = [breathing_metrics(m, n, scale_frac=scale_frac) for m in mag]
+        return [dict(per_row[j]) for j in inv]
+    real = np.stack([alpha_r, beta_r, lam, rho], axis=1)
+    uniq, inv = np.unique(real, axis=0, return_inverse=True)
+    acc = OnlineBreathing((len(uniq),), scale_frac, rel_err)
+    M0 = np.zeros(len(uniq))
+    for start in range(0, N, block):
+        stop = min(N, start + block)
+        n = np.arange(start + 2, stop + 2, dtype=float)
+        with stage("series", terms=(stop - start) * len(uniq)):
+            b = baseline_term(n[None, :], uniq[:, 0:1], uniq[:, 1:2], share=False)
+            mag, M = run_recurrence_batch(b, uniq[:, 2], uniq[:, 3], M0=M0, mode=mode)
+        with stage("metrics"):
+            acc.update(mag)
+        M0 = M[:, -1]
+    per_row = acc.metrics()
+    return [dict(per_row[j]) for j in np.ravel(inv)]
+
+
+def breathing_points(points: list,
+                     N: int,
+                     alpha_r: float,
+                     beta_r: float,
+                     lam: float,
+                     rho: float,
+                     batched: bool = True,
+                     mode: str = "auto",
+                     streaming: bool = False) -> list:
+    """Chunk function for sweep_executor.run_sweep over (alpha_i, beta_i) points."""
+    ai = [p["alpha_i"] for p in points]
+    bi = [p["beta_i"] for p in points]
+    if batched:
+        mets = breathing_metrics_batch(N, alpha_r, beta_r, ai, bi, lam, rho, scale_frac=0.5, mode=mode,
+                                       streaming=streaming)
+    else:
+        mets = []
+        for x, y in zip(ai, bi):
+            n, a, phase, M = complex_series(N, alpha_r, beta_r, x, y, lam, rho, mode=mode)
+            mets.append(breathing_metrics(a, n, scale_frac=0.5))
+    return [{"alpha_i": p["alpha_i"], "beta_i": p["beta_i"], **m} for p, m in zip(points, mets)]
+
+
 if __name__ == "__main__":
-    n, a, phase, M = complex_series(N=400000,
-                                    alpha_r=1.0,
-                                    beta_r=1.0,
-                                    alpha_i=2.8,
-                                    beta_i=2.9,
-                                    lam=1e-4,
-                                    rho=1.0)
-    metrics = breathing_metrics(a, n, scale_frac=0.5)
+    metrics = breathing_metrics_stream(complex_series_blocks(N=400000,
+                                                             alpha_r=1.0,
+                                                             beta_r=1.0,
+                                                             alpha_i=2.8,
+                                                             beta_i=2.9,
+                                                             lam=1e-4,
+                                                             rho=1.0,
+                                                             block=1 << 16),
+                                       scale_frac=0.5)
     print(metrics)
 
 
@@ -1,9 +1,14 @@
 import os
+from functools import partial
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
+from typing import TYPE_CHECKING
 
-from complex_breathing import complex_series, breathing_metrics
+from .complex_breathing import breathing_points
+from .result_store import pivot, store_path
+from .sweep_executor import run_sweep
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 def ensure_out(dirpath: str = "figures") -> str:
@@ -20,31 +25,38 @@ def scan_grid(alpha_r: float = 1.0,
               steps: int = 7,
               N: int = 60000,
               lam: float = 1e-4,
-              rho: float = 1.0) -> pd.DataFrame:
+              rho: float = 1.0,
+              batched: bool = True,
+              streaming: bool = False,
+              csv_path: str | None = None,
+              workers: int = 1,
+              chunk_size: int | None = None,
+              queue_dir: str | None = None) -> "pd.DataFrame":
+    import pandas as pd
+
     a_is = np.linspace(alpha_i_min, alpha_i_max, steps)
     b_is = np.linspace(beta_i_min, beta_i_max, steps)
-    rows = []
-    for ai in a_is:
-        for bi in b_is:
-            n, a, phase, M = complex_series(N, alpha_r, beta_r, ai, bi, lam, rho)
-            mets = breathing_metrics(a, n, scale_frac=0.5)
-            rows.append({
-                "alpha_i": ai,
-                "beta_i": bi,
-                "residence": mets["residence"],
-                "amplitude_std": mets["amplitude_std"],
-                "mean_mag": mets["mean_mag"],
-            })
+    points = [{"alpha_i": float(ai), "beta_i": float(bi)} for ai in a_is for bi in b_is]
+    fixed = {"N": N, "alpha_r": alpha_r, "beta_r": beta_r, "lam": lam, "rho": rho}
+    if chunk_size is None:
+        # A single batch shares one recurrence; split only to parallelise or checkpoint
+        chunk_size = steps if (workers > 1 or csv_path) else len(points)
+    rows = run_sweep(partial(breathing_points, batched=batched, streaming=streaming, **fixed),
+                     points,
+                     csv_path=csv_path,
+                     workers=workers,
+                     chunk_size=chunk_size,
+                     meta={**fixed, "streaming": streaming},
+                     queue_dir=queue_dir,
+                     store_path=store_path(csv_path) if csv_path else None)
     return pd.DataFrame(rows)
 
 
-def heatmap(df: pd.DataFrame, value: str, outpng: str):
-    a_vals = np.sort(df["alpha_i"].unique())
-    b_vals = np.sort(df["beta_i"].unique())
-    grid = np.zeros((len(a_vals), len(b_vals)))
-    for i, ai in enumerate(a_vals):
-        for j, bi in enumerate(b_vals):
-            grid[i, j] = df[(df.alpha_i == ai) & (df.beta_i == bi)][value].values[0]
+def heatmap(df, value: str, outpng: str):
+    """df: a DataFrame or result_store table of scan_grid rows."""
+    import matplotlib.pyplot as plt
+
+    a_vals, b_vals, grid = pivot(df, "alpha_i", "beta_i", value)
     plt.figure(figsize=(6, 5))
     im = plt.imshow(grid, origin='lower', aspect='auto',
                     extent=[b_vals.min(), b_vals.max(), a_vals.min(), a_vals.max()])
@@ -58,14 +70,24 @@ def heatmap(df: pd.DataFrame, value: str, outpng: str):
 
 
 if __name__ == "__main__":
+    import inspect
+    from .instrument import RunRecorder
+
     figdir = ensure_out()
-    df = scan_grid()
     csv_path = os.path.join(figdir, "complex_grid.csv")
-    df.to_csv(csv_path, index=False)
-    heatmap(df, "residence", os.path.join(figdir, "complex_grid_residence.png"))
-    heatmap(df, "amplitude_std", os.path.join(figdir, "complex_grid_amplitude.png"))
-    print({"saved": [csv_path,
-                     "figures/complex_grid_residence.png",
-                     "figures/complex_grid_amplitude.png"]})
+    saved = [csv_path,
+             store_path(csv_path),
+             "figures/complex_grid_residence.png",
+             "figures/complex_grid_amplitude.png"]
+    params = {k: p.default for k, p in inspect.signature(scan_grid).parameters.items()}
+    params.update(csv_path=csv_path, workers=os.cpu_count() or 1)
+    with RunRecorder("complex_grid", params, outputs=saved, figdir=figdir) as rec:
+        rec.terms = params["N"] * params["steps"] ** 2
+        with rec.stage("sweep", terms=rec.terms):
+            df = scan_grid(csv_path=csv_path, workers=params["workers"])
+        with rec.stage("render"):
+            heatmap(df, "residence", os.path.join(figdir, "complex_grid_residence.png"))
+            heatmap(df, "amplitude_std", os.path.join(figdir, "complex_grid_amplitude.png"))
+    print({"saved": saved + [rec.sidecar]})
 
 
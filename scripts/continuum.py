@@ -0,0 +1,150 @@
+import math
+from typing import Optional, Sequence
+
+from .grid_tables import baseline_term
+from .recurrence import stream_recurrence
+
+
+# Hybrid evaluation of the recurrence M(x+1) = M(x) + g(x, M(x)) with
+# g = scale * x^-alpha * (ln x)^-beta * exp(-lam * M^rho). Writing the shift as
+# e^D, the recurrence is (e^D - 1) M = g, i.e. the Euler-Maclaurin form
+#     dM/dx = g - Dg/2 + D^2 g/12 - D^4 g/720 + ...
+# where D is the derivative along the trajectory. Integrating that modified
+# equation from an exact discrete prefix reproduces the discrete sums, with
+# the first omitted term as the truncation estimate.
+
+
+def _rhs(x: float, M: float, alpha: float, beta: float, lam: float, rho: float, scale: float):
+    ln_x = math.log(x)
+    g = scale * math.exp(-alpha * ln_x - beta * math.log(ln_x) - lam * M ** rho)
+    # d/dx ln b and its derivative
+    # Powers of 1/x rather than of x: x ** k overflows (OverflowError) long
+    # before the tail stops being meaningful
+    inv_x = 1.0 / x
+    h = -alpha * inv_x - beta * inv_x / ln_x
+    dh = alpha * inv_x * inv_x + beta * (ln_x + 1.0) * (inv_x / ln_x) ** 2
+    # d/dM of lam*M^rho and its derivative (M > 0 after the discrete prefix)
+    if rho == 1.0:
+        phi, dphi = lam, 0.0
+    else:
+        phi = lam * rho * M ** (rho - 1.0)
+        dphi = lam * rho * (rho - 1.0) * M ** (rho - 2.0)
+    L = h - phi * g
+    dL = dh - dphi * g * g - phi * g * L
+    # Dg with M' = g - Dg/2 fed back once through the memory term
+    Dg = g * L * (1.0 + 0.5 * phi * g)
+    F = g - 0.5 * Dg + g * (L * L + dL) / 12.0
+    # Leading power-law size of D^4 g, for the truncation estimate
+    trunc = g * alpha * (alpha + 1.0) * (alpha + 2.0) * (alpha + 3.0) * inv_x ** 4 / 720.0
+    return F, trunc
+
+
+def _rk4(u: float, y, du: float, params, base: float):
+    # One RK4 step of (D, T) in u = ln x, with M = base + D, dM/du = x F and
+    # dT/du = x |trunc|. Carrying D separately keeps short increments exact.
+    def f(u, y):
+        x = math.exp(u)
+        F, tr = _rhs(x, base + y[0], *params)
+        return (x * F, x * abs(tr))
+
+    k1 = f(u, y)
+    k2 = f(u + 0.5 * du, (y[0] + 0.5 * du * k1[0], y[1] + 0.5 * du * k1[1]))
+    k3 = f(u + 0.5 * du, (y[0] + 0.5 * du * k2[0], y[1] + 0.5 * du * k2[1]))
+    k4 = f(u + du, (y[0] + du * k3[0], y[1] + du * k3[1]))
+    return (y[0] + du / 6.0 * (k1[0] + 2 * k2[0] + 2 * k3[0] + k4[0]),
+            y[1] + du / 6.0 * (k1[1] + 2 * k2[1] + 2 * k3[1] + k4[1]))
+
+
+def integrate_tail(M0: float,
+                   x0: float,
+                   targets: Sequence[float],
+                   alpha: float,
+                   beta: float,
+                   lam: float,
+                   rho: float,
+                   scale: float = 1.0,
+                   rtol: float = 1e-13,
+                   atol: float = 1e-18,
+                   du0: float = 1e-3) -> dict:
+    """Carry M from x0 to each of the ascending targets.
+
+    Adaptive RK4 in u = ln x with step doubling: the half-step difference /15
+    is the local error, accumulated into `integration_err`; `truncation_err`
+    integrates the first omitted Euler-Maclaurin term. `increments` holds
+    M(target_i) - M(target_{i-1}) (from x0 for the first), integrated on
+    their own so that short windows far out keep full relative precision.
+    """
+    params = (alpha, beta, lam, rho, scale)
+    u = math.log(x0)
+    base = float(M0)
+    y = (0.0, 0.0)
+    du = du0
+    err = 0.0
+    steps = 0
+    values = []
+    increments = []
+    for target in targets:
+        u_end = math.log(target)
+        while u < u_end - 1e-15 * max(1.0, abs(u_end)):
+            h = min(du, u_end - u)
+            full = _rk4(u, y, h, params, base)
+            half = _rk4(u, y, 0.5 * h, params, base)
+            half = _rk4(u + 0.5 * h, half, 0.5 * h, params, base)
+            local = abs(half[0] - full[0]) / 15.0
+            tol = atol + rtol * abs(half[0])
+            if local <= tol or h < 1e-12:
+                u += h
+                # Richardson-extrapolated step
+                y = (half[0] + (half[0] - full[0]) / 15.0, half[1])
+                err += local
+                steps += 1
+                du = h * min(4.0, 0.9 * (tol / max(local, 1e-300)) ** 0.2)
+            else:
+                du = h * max(0.1, 0.9 * (tol / local) ** 0.2)
+        increments.append(y[0])
+        base += y[0]
+        values.append(base)
+        y = (0.0, y[1])
+    return {
+        "values": values,
+        "increments": increments,
+        "integration_err": err,
+        "truncation_err": y[1],
+        "steps": steps,
+    }
+
+
+def hybrid_accumulate(N: int,
+                      alpha: float,
+                      beta: float,
+                      lam: float,
+                      rho: float,
+                      n0: int,
+                      at: Optional[Sequence[int]] = None,
+                      scale: float = 1.0,
+                      mode: str = "auto") -> dict:
+    """M at term indices `at` (default: the last, N - 1) of an N-term series.
+
+    The first n0 terms are summed exactly by the discrete recurrence; the rest
+    comes from integrate_tail. Indices must satisfy n0 - 1 <= j < N. Keep n0
+    at 10^3 or more: below that the correction series is too coarse for the
+    error estimate to be reliable.
+    """
+    at = sorted(at) if at is not None else [N - 1]
+    if at[0] < n0 - 1 or at[-1] >= N:
+        raise ValueError(f"hybrid indices must lie in [{n0 - 1}, {N}); got {at[0]}..{at[-1]}")
+    accum = 0.0
+    for n, a, M in stream_recurrence(lambda n: scale * baseline_term(n, alpha, beta, share=False),
+                                     n0, lam, rho, mode=mode):
+        accum = float(M[-1])
+    # Term j has n = j + 2; the sum through it is M(x) at x = j + 3
+    tail = integrate_tail(accum, n0 + 2, [j + 3 for j in at], alpha, beta, lam, rho, scale=scale)
+    return {
+        "at": at,
+        "values": tail["values"],
+        "increments": tail["increments"],
+        "prefix": accum,
+        "integration_err": tail["integration_err"],
+        "truncation_err": tail["truncation_err"],
+        "error_estimate": tail["integration_err"] + tail["truncation_err"],
+    }
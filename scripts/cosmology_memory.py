@@ -1,26 +1,43 @@
 import numpy as np
 
+from .grid_tables import baseline_term
+from .recurrence import run_recurrence
+from .series_cache import cached_series
+
+
+def _H_segment(start: int,
+               stop: int,
+               alpha: float,
+               beta: float,
+               lam: float,
+               rho: float,
+               H0: float = 1.0,
+               M0: float = 0.0,
+               mode: str = "auto",
+               share: bool = True) -> dict:
+    t = np.arange(start + 2, stop + 2, dtype=float)
+    b = baseline_term(t, alpha, beta, share=share)
+    _, M = run_recurrence(b, lam, rho, M0=M0, mode=mode)
+    return {"H": H0 + M, "M": M}
+
 
 def H_series(T: int,
              alpha: float,
              beta: float,
              lam: float,
              rho: float,
-             H0: float = 1.0) -> np.ndarray:
-    t = np.arange(2, T + 2, dtype=float)
-    ln_t = np.log(t)
-    ln_t = np.where(ln_t == 0.0, np.finfo(float).tiny, ln_t)
-    b = 1.0 / (np.power(t, alpha) * np.power(ln_t, beta))
-    H = np.empty_like(b)
-    M = 0.0
-    acc = 0.0
-    for i in range(T):
-        fm = np.exp(-lam * (M ** rho))
-        term = b[i] * fm
-        acc += term
-        M += term
-        H[i] = H0 + acc
-    return H
+             H0: float = 1.0,
+             mode: str = "auto",
+             cache: bool = False) -> np.ndarray:
+    if cache:
+        out = cached_series("H_series",
+                            {"alpha": alpha, "beta": beta, "lam": lam, "rho": rho, "H0": H0},
+                            T,
+                            lambda start, stop, M0: _H_segment(start, stop, alpha, beta, lam, rho,
+                                                               H0, M0=M0, mode=mode, share=False))
+    else:
+        out = _H_segment(0, T, alpha, beta, lam, rho, H0, mode=mode)
+    return out["H"]
 
 
 if __name__ == "__main__":
@@ -1,7 +1,9 @@
-import os
 import numpy as np
-import pandas as pd
-from series_validation import classify
+from functools import partial
+
+from .series_validation import classify_points
+from .result_store import store_path
+from .sweep_executor import run_sweep
 
 
 def sweep_alpha_beta(N: int,
@@ -11,23 +13,40 @@ def sweep_alpha_beta(N: int,
                      steps: int = 9,
                      lam: float = 1e-4,
                      rho: float = 1.0,
-                     csv_path: str | None = "figures/critical_sweep.csv"):
+                     csv_path: str | None = "figures/critical_sweep.csv",
+                     batched: bool = True,
+                     workers: int = 1,
+                     chunk_size: int | None = None,
+                     window: int = 10000,
+                     queue_dir: str | None = None):
     alphas = np.linspace(alpha_center - delta, alpha_center + delta, steps)
     betas = np.linspace(beta_center - delta, beta_center + delta, steps)
-    results = []
-    for a in alphas:
-        for b in betas:
-            res = classify(N, a, b, lam, rho)
-            results.append(res)
-            print(res)
-    if csv_path:
-        df = pd.DataFrame(results)
-        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
-        df.to_csv(csv_path, index=False)
+    points = [{"N": N, "alpha": float(a), "beta": float(b), "lam": float(lam), "rho": float(rho)}
+              for a in alphas
+              for b in betas]
+    # Rows stream into a journal next to csv_path, so an interrupted sweep resumes,
+    # and into the columnar store the heatmaps read
+    results = run_sweep(partial(classify_points, batched=batched, window=window),
+                        points,
+                        csv_path=csv_path,
+                        workers=workers,
+                        chunk_size=chunk_size or steps,
+                        meta={"window": window},
+                        queue_dir=queue_dir,
+                        store_path=store_path(csv_path) if csv_path else None)
+    for res in results:
+        print(res)
     return results
 
 
 if __name__ == "__main__":
-    sweep_alpha_beta(N=800000, delta=0.02, steps=9)
-
+    import os
+    from .instrument import RunRecorder
 
+    params = {"N": 800000, "alpha_center": 1.0, "beta_center": 1.0, "delta": 0.02, "steps": 9,
+              "lam": 1e-4, "rho": 1.0, "csv_path": "figures/critical_sweep.csv",
+              "workers": os.cpu_count() or 1}
+    with RunRecorder("critical_sweep", params, outputs=[params["csv_path"], store_path(params["csv_path"])]) as rec:
+        rec.terms = params["N"] * params["steps"] ** 2
+        with rec.stage("sweep", terms=rec.terms):
+            sweep_alpha_beta(**params)
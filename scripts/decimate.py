@@ -0,0 +1,92 @@
+import numpy as np
+from typing import Callable, Tuple
+
+
+# A line plot saved at a given size and dpi has only so many pixel columns;
+# drawing more points than that costs time and memory without changing the
+# image. These reduce (x, y) to a few points per column before plotting.
+
+
+def _bucket_starts(x: np.ndarray, buckets: int) -> np.ndarray:
+    # Buckets are equal widths in x (pixel columns for a linear x axis); x must be sorted
+    edges = np.linspace(x[0], x[-1], buckets + 1)
+    starts = np.searchsorted(x, edges[:-1], side="left")
+    return np.unique(starts)
+
+
+def _first_where(y: np.ndarray, seg: np.ndarray, target: np.ndarray) -> np.ndarray:
+    hit = np.flatnonzero(y == target[seg])
+    _, first = np.unique(seg[hit], return_index=True)
+    return hit[first]
+
+
+def minmax(x, y, buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the first, last, minimum and maximum point of every x bucket.
+
+    x must be ascending. The result traces the same per-column envelope as
+    the full line, so the rendered image is unchanged up to antialiasing.
+    NaNs are dropped.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = np.isfinite(x) & np.isfinite(y)
+    if not keep.all():
+        x, y = x[keep], y[keep]
+    if len(x) <= 4 * buckets:
+        return x, y
+    starts = _bucket_starts(x, buckets)
+    lengths = np.diff(np.append(starts, len(x)))
+    seg = np.repeat(np.arange(len(starts)), lengths)
+    lo = _first_where(y, seg, np.minimum.reduceat(y, starts))
+    hi = _first_where(y, seg, np.maximum.reduceat(y, starts))
+    idx = np.unique(np.concatenate((starts, starts + lengths - 1, lo, hi)))
+    return x[idx], y[idx]
+
+
+def lttb(x, y, n_out: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Largest-Triangle-Three-Buckets: n_out points that keep the visual shape.
+
+    Unlike minmax() it does not keep the exact envelope, but it gives a fixed
+    point count and suits smooth curves.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    N = len(x)
+    if n_out >= N or n_out < 3:
+        return x, y
+    edges = np.linspace(1, N - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, N - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt = slice(hi, edges[i + 2]) if i + 2 < len(edges) else slice(N - 1, N)
+        cx, cy = x[nxt].mean(), y[nxt].mean()
+        xs, ys = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - cx) * (ys - y[a]) - (x[a] - xs) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return x[out], y[out]
+
+
+def plot_line(x, y, *args,
+              plot: Callable = None,
+              dpi: float = 150,
+              method: str = "minmax",
+              **kwargs):
+    """plot(x, y, ...) after reducing the line to the current figure's pixel width at dpi.
+
+    plot defaults to plt.plot; pass plt.semilogy (or an Axes method) for
+    other line plots.
+    """
+    import matplotlib.pyplot as plt
+
+    plot = plot or plt.plot
+    columns = max(16, int(plt.gcf().get_size_inches()[0] * dpi))
+    if method == "minmax":
+        x, y = minmax(x, y, columns)
+    elif method == "lttb":
+        x, y = lttb(x, y, 2 * columns)
+    elif method != "none":
+        raise ValueError(f"method must be 'minmax', 'lttb' or 'none', got {method!r}")
+    return plot(x, y, *args, **kwargs)
@@ -0,0 +1,167 @@
+import numpy as np
+from functools import partial
+
+from .instrument import stage
+from .series_validation import classify_batch
+from .sketch import LogSketch
+from .sweep_executor import run_sweep, write_csv
+from .threshold import time_to_threshold
+
+
+# Monte Carlo over uncertain (alpha, beta, lam, rho). A prior per parameter is
+# a constant or one of
+#   ("uniform", lo, hi), ("loguniform", lo, hi), ("normal", mu, sigma), ("lognormal", mu, sigma)
+# (lognormal: mu and sigma of ln x). Samples come in chunks, and chunk i draws
+# from its own stream SeedSequence(seed, spawn_key=(i,)), so the samples, and
+# the summaries merged in chunk order, do not depend on how many workers ran.
+PARAMS = ("alpha", "beta", "lam", "rho")
+METRICS = ("sum", "windowed_growth", "tail_mean")
+# +-0.02 around the critical point, lam known to a factor ~1.6
+DEFAULT_PRIORS = {"alpha": ("uniform", 0.98, 1.02), "beta": ("uniform", 0.98, 1.02),
+                  "lam": ("lognormal", float(np.log(1e-4)), 0.5), "rho": 1.0}
+
+
+def _draw(rng: np.random.Generator, prior, size: int) -> np.ndarray:
+    if np.isscalar(prior):
+        return np.full(size, float(prior))
+    kind, a, b = prior
+    if kind == "uniform":
+        return rng.uniform(a, b, size)
+    if kind == "loguniform":
+        return np.exp(rng.uniform(np.log(a), np.log(b), size))
+    if kind == "normal":
+        return rng.normal(a, b, size)
+    if kind == "lognormal":
+        return rng.lognormal(a, b, size)
+    raise ValueError(f"unknown prior {kind!r}; expected uniform, loguniform, normal or lognormal")
+
+
+def draw_samples(priors: dict, seed: int, chunk: int, size: int) -> dict:
+    """The parameter samples of one chunk (arrays keyed by parameter)."""
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk,)))
+    return {p: _draw(rng, priors[p], size) for p in PARAMS}
+
+
+class EnsembleSummary:
+    """Streaming summary of named metrics over samples: exact count, mean and std,
+    quantiles and histograms within the LogSketch relative error.
+
+    Metrics must be nonnegative; NaN values (e.g. N_c when phi_c is never
+    reached) are counted separately and left out of the statistics.
+    """
+
+    def __init__(self, names, rel_err: float = 1e-3):
+        self.names = list(names)
+        self.rel_err = rel_err
+        self.sketches = {k: LogSketch((), rel_err) for k in self.names}
+        self.nan = {k: 0 for k in self.names}
+
+    def update(self, values: dict):
+        for k in self.names:
+            x = np.asarray(values[k], dtype=float)
+            bad = np.isnan(x)
+            self.nan[k] += int(bad.sum())
+            self.sketches[k].update(x[~bad])
+
+    def merge(self, other: "EnsembleSummary") -> "EnsembleSummary":
+        for k in self.names:
+            self.sketches[k].merge(other.sketches[k])
+            self.nan[k] += other.nan[k]
+        return self
+
+    def quantile(self, name: str, q: float) -> float:
+        return float(self.sketches[name].quantile(q))
+
+    def histogram(self, name: str, edges) -> np.ndarray:
+        """Sample counts between consecutive edges (buckets split at the edges by interpolation)."""
+        edges = np.asarray(edges, dtype=float)
+        return np.array([float(self.sketches[name].window(lo, hi)[0]) for lo, hi in zip(edges[:-1], edges[1:])])
+
+    def table(self, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)) -> list:
+        rows = []
+        for k in self.names:
+            sk = self.sketches[k]
+            n = float(sk.count[0])
+            mean = float(sk.total[0]) / n if n else float("nan")
+            var = float(sk.total_sq[0]) / n - mean ** 2 if n else float("nan")
+            row = {"metric": k, "count": int(n), "nan": self.nan[k], "mean": mean,
+                   "std": float(np.sqrt(max(var, 0.0))) if n else float("nan")}
+            for q in quantiles:
+                row[f"q{round(100 * q):02d}"] = self.quantile(k, q)
+            rows.append(row)
+        return rows
+
+
+def ensemble_chunks(points: list,
+                    priors: dict,
+                    N: int,
+                    seed: int,
+                    window: int = 10000,
+                    phi_c: float | None = None,
+                    n_max: int = 10**12,
+                    exact_max: int = 1 << 20,
+                    rel_err: float = 1e-3,
+                    mode: str = "auto") -> list:
+    """Chunk function for sweep_executor.run_sweep: one summary row per {"chunk", "size"} point."""
+    names = list(METRICS) + (["N_c"] if phi_c is not None else [])
+    rows = []
+    for p in points:
+        s = draw_samples(priors, seed, p["chunk"], p["size"])
+        summary = EnsembleSummary(names, rel_err)
+        batch = classify_batch(N, s["alpha"], s["beta"], s["lam"], s["rho"], mode=mode, window=window)
+        values = {k: np.array([r[k] for r in batch]) for k in METRICS}
+        if phi_c is not None:
+            values["N_c"] = time_to_threshold(s["alpha"], s["beta"], s["lam"], s["rho"], phi_c,
+                                              n_max=n_max, exact_max=exact_max, mode=mode)["N_c"]
+        with stage("metrics"):
+            summary.update(values)
+        rows.append({"chunk": p["chunk"], "summary": summary})
+    return rows
+
+
+def run_ensemble(priors: dict,
+                 samples: int,
+                 N: int,
+                 seed: int = 0,
+                 window: int = 10000,
+                 phi_c: float | None = None,
+                 n_max: int = 10**12,
+                 exact_max: int = 1 << 20,
+                 batch: int = 256,
+                 workers: int = 1,
+                 rel_err: float = 1e-3,
+                 csv_path: str | None = None) -> EnsembleSummary:
+    """Summaries of sum, windowed_growth, tail_mean (and N_c for a phi_c) over `samples` draws.
+
+    Each chunk of `batch` samples is advanced as one classify_batch, and
+    chunks are spread over `workers` processes. Only per-chunk sketches come
+    back, so memory does not grow with the number of samples. csv_path
+    receives summary.table().
+    """
+    priors = {p: priors.get(p, d) for p, d in zip(PARAMS, (1.0, 1.0, 1e-4, 1.0))}
+    points = [{"chunk": i, "size": min(batch, samples - start)}
+              for i, start in enumerate(range(0, samples, batch))]
+    rows = run_sweep(partial(ensemble_chunks, priors=priors, N=N, seed=seed, window=window, phi_c=phi_c,
+                             n_max=n_max, exact_max=exact_max, rel_err=rel_err),
+                     points, workers=workers, chunk_size=1, key_cols=["chunk"])
+    summary = EnsembleSummary(list(METRICS) + (["N_c"] if phi_c is not None else []), rel_err)
+    for row in rows:
+        summary.merge(row["summary"])
+    if csv_path:
+        with stage("csv_write"):
+            write_csv(csv_path, summary.table())
+    return summary
+
+
+if __name__ == "__main__":
+    import os
+    from .instrument import RunRecorder
+
+    priors = DEFAULT_PRIORS
+    params = {"samples": 1024, "N": 200000, "seed": 0, "window": 10000, "phi_c": 4.0,
+              "workers": os.cpu_count() or 1, "csv_path": "figures/ensemble_summary.csv"}
+    with RunRecorder("ensemble", {**params, "priors": priors}, outputs=[params["csv_path"]]) as rec:
+        rec.terms = params["samples"] * params["N"]
+        summary = run_ensemble(priors, **params)
+    for row in summary.table():
+        print(row)
@@ -0,0 +1,83 @@
+import os
+from collections import OrderedDict
+from typing import Tuple
+
+import numpy as np
+
+
+# ln n and ln ln n over the index grids n = start+2 .. stop+1 that every
+# series is built on. A sweep evaluates the same grid once per parameter
+# point, so the tables are computed once per process and shared; the power
+# law b_n = n^-alpha (ln n)^-beta is then a single exp of a linear
+# combination of them. Least recently used grids are dropped beyond MAX_BYTES.
+# Streamed and cached series walk a long run block by block and never revisit
+# a block, so they pass share=False and keep their grids out of the tables.
+MAX_BYTES = int(float(os.environ.get("GRID_TABLE_MAX_BYTES", 512e6)))
+
+_tables: "OrderedDict[tuple, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+_bytes = 0
+
+
+def _is_unit_grid(flat: np.ndarray) -> bool:
+    return (flat.size > 1 and flat[-1] - flat[0] == flat.size - 1
+            and bool(np.all(flat[1:] - flat[:-1] == 1.0)))
+
+
+def _compute(flat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    ln_n = np.log(flat)
+    ln_n = np.where(ln_n == 0.0, np.finfo(float).tiny, ln_n)
+    return ln_n, np.log(ln_n)
+
+
+def log_tables(n: np.ndarray, share: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """(ln n, ln ln n), shaped like n; read-only and shared when n is a unit-step grid and share is set.
+
+    ln n = 0 (n = 1) is replaced by the smallest normal float, as in the
+    original baseline, so that (ln n)^-beta stays finite.
+    """
+    global _bytes
+    n = np.asarray(n, dtype=float)
+    flat = n.ravel()
+    if not share or not _is_unit_grid(flat):
+        ln_n, ln_ln_n = _compute(flat)
+        return ln_n.reshape(n.shape), ln_ln_n.reshape(n.shape)
+    key = (float(flat[0]), flat.size)
+    hit = _tables.get(key)
+    if hit is None:
+        hit = _compute(flat)
+        for table in hit:
+            table.flags.writeable = False
+        size = 2 * flat.nbytes
+        if size <= MAX_BYTES:
+            while _tables and _bytes + size > MAX_BYTES:
+                _, old = _tables.popitem(last=False)
+                _bytes -= 2 * old[0].nbytes
+            _tables[key] = hit
+            _bytes += size
+    else:
+        _tables.move_to_end(key)
+    return hit[0].reshape(n.shape), hit[1].reshape(n.shape)
+
+
+def clear():
+    global _bytes
+    _tables.clear()
+    _bytes = 0
+
+
+def baseline_term(n: np.ndarray, alpha, beta, dtype=np.float64, share: bool = True) -> np.ndarray:
+    """b_n = n^-alpha (ln n)^-beta as exp(-alpha ln n - beta ln ln n); alpha, beta broadcast against n.
+
+    Other dtypes (np.longdouble for the reference precision) skip the tables.
+    """
+    if np.dtype(dtype) != np.float64:
+        ln_n = np.log(np.asarray(n, dtype=dtype))
+        return np.exp(-(np.multiply(alpha, ln_n) + np.multiply(beta, np.log(ln_n))))
+    ln_n, ln_ln_n = log_tables(n, share)
+    x = np.asarray(np.multiply(alpha, ln_n))
+    if np.any(beta != 0.0):
+        y = np.multiply(beta, ln_ln_n)
+        x = np.add(x, y, out=x if x.shape == np.shape(y) else None)
+    # x is a fresh array here, never one of the shared tables
+    np.negative(x, out=x)
+    return np.exp(x, out=x)
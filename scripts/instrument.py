@@ -0,0 +1,194 @@
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# The recorder of the run in progress in this process, if any. Library code
+# marks its stages with stage(), which is a no-op when nothing is recording.
+_active = None
+
+
+def run_metadata() -> dict:
+    import importlib.metadata
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        # Read from the installed metadata: importing numba itself is slow
+        numba_version = importlib.metadata.version("numba")
+    except importlib.metadata.PackageNotFoundError:
+        numba_version = None
+    from .recurrence import resolve_mode
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "argv": sys.argv,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "numba": numba_version,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "recurrence_mode": resolve_mode("auto"),
+    }
+
+
+def peak_rss_mb(who: str = "self") -> Optional[float]:
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1e-6 if sys.platform == "darwin" else 1e-3
+    return usage.ru_maxrss * scale
+
+
+class RunRecorder:
+    """Collects stage timings for one run and writes them to a JSON sidecar.
+
+    Used as a context manager around an entry point. Stages with the same name
+    accumulate (they can be entered once per block) and may nest, so their
+    times need not add up to the total. With profile (or RUN_PROFILE=1 in the
+    environment) the run is also profiled with cProfile: the stats go to
+    <name>.prof and the hottest functions into the sidecar. Work done in
+    spawned sweep workers is timed per stage but not profiled.
+    """
+
+    def __init__(self,
+                 name: str,
+                 params: dict,
+                 outputs: tuple = (),
+                 figdir: str = "figures",
+                 profile: Optional[bool] = None,
+                 profile_top: int = 25):
+        self.name = name
+        self.params = params
+        self.outputs = list(outputs)
+        self.figdir = figdir
+        self.profile = bool(int(os.environ.get("RUN_PROFILE", "0"))) if profile is None else profile
+        self.profile_top = profile_top
+        self.stages = {}
+        self.terms = 0
+        self.counts = {}
+        self._profiler = None
+        self._prev = None
+
+    @property
+    def sidecar(self) -> str:
+        return os.path.join(self.figdir, f"{self.name}.run.json")
+
+    @contextlib.contextmanager
+    def stage(self, name: str, terms: int = 0):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0, terms)
+
+    def add(self, name: str, wall_s: float, terms: int = 0, calls: int = 1):
+        st = self.stages.setdefault(name, {"wall_s": 0.0, "calls": 0, "terms": 0})
+        st["wall_s"] += wall_s
+        st["calls"] += calls
+        st["terms"] += int(terms)
+
+    def merge(self, stages: dict):
+        for name, st in stages.items():
+            self.add(name, st["wall_s"], st["terms"], st["calls"])
+
+    def __enter__(self):
+        global _active
+        self._prev, _active = _active, self
+        self._t0 = time.perf_counter()
+        if self.profile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _active
+        wall = time.perf_counter() - self._t0
+        _active = self._prev
+        report = {
+            "name": self.name,
+            "status": "ok" if exc_type is None else f"error: {exc_type.__name__}",
+            "meta": run_metadata(),
+            "params": self.params,
+            "outputs": self.outputs,
+            "wall_s": wall,
+            "terms": self.terms,
+            "terms_per_s": self.terms / wall if self.terms and wall > 0 else None,
+            "peak_rss_mb": peak_rss_mb("self"),
+            "peak_rss_children_mb": peak_rss_mb("children"),
+            "counts": self.counts,
+            "stages": {name: {**st, "terms_per_s": st["terms"] / st["wall_s"]
+                              if st["terms"] and st["wall_s"] > 0 else None}
+                       for name, st in self.stages.items()},
+        }
+        os.makedirs(self.figdir, exist_ok=True)
+        if self._profiler is not None:
+            import pstats
+            self._profiler.disable()
+            prof_path = os.path.join(self.figdir, f"{self.name}.prof")
+            self._profiler.dump_stats(prof_path)
+            stats = pstats.Stats(self._profiler)
+            rows = []
+            for (path, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+                rows.append({"function": f"{os.path.basename(path)}:{line}({func})",
+                             "calls": nc, "tottime_s": tt, "cumtime_s": ct})
+            rows.sort(key=lambda r: r["tottime_s"], reverse=True)
+            report["profile"] = {"path": prof_path, "top": rows[:self.profile_top]}
+        tmp = self.sidecar + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        os.replace(tmp, self.sidecar)
+        return False
+
+
+def active() -> Optional[RunRecorder]:
+    return _active
+
+
+def stage(name: str, terms: int = 0):
+    """Time a block under `name` in the active recorder, if there is one."""
+    if _active is None:
+        return contextlib.nullcontext()
+    return _active.stage(name, terms)
+
+
+def count_terms(terms: int):
+    if _active is not None:
+        _active.terms += int(terms)
+
+
+def record_counts(**counts):
+    """Store named counts (e.g. how many points a sweep evaluated) in the active recorder's sidecar."""
+    if _active is not None:
+        _active.counts.update(counts)
+
+
+def collect(func: Callable, *args, **kwargs):
+    """Call func under a throwaway recorder and return (result, stages).
+
+    Lets a pool worker send its stage timings back with its result.
+    """
+    global _active
+    rec = RunRecorder("worker", {})
+    prev, _active = _active, rec
+    try:
+        return func(*args, **kwargs), rec.stages
+    finally:
+        _active = prev
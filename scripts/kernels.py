@@ -0,0 +1,64 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Callable, Dict, Union
+
+
+# Memory kernels f(M) damping the increments, a_n = b_n * f(M_n). Each takes
+# (M, lam, rho, kappa) and is vectorised over M; kappa is ignored by the
+# families that do not use it. Built-in families carry a `kind` that the
+# compiled recurrence loop (recurrence.py) has an incremental fast path for;
+# user-supplied kernels run on the NumPy engine.
+EXP, RATIONAL, LOGISTIC, USER = 0, 1, 2, -1
+
+
+def stretched_exp(M, lam: float, rho: float, kappa: float = 1.0):
+    """exp(-lam * M^rho), the original memory factor."""
+    return np.exp(-lam * np.power(M, rho))
+
+
+def rational_power(M, lam: float, rho: float, kappa: float = 1.0):
+    """(1 + lam * M^rho)^(-kappa): power-law instead of exponential forgetting."""
+    return np.power(1.0 + lam * np.power(M, rho), -kappa)
+
+
+def logistic(M, lam: float, rho: float, kappa: float = 1.0):
+    """Logistic switch-off around M^rho = kappa with steepness lam, scaled to f(0) = 1."""
+    with np.errstate(over="ignore"):
+        return (1.0 + np.exp(-lam * kappa)) / (1.0 + np.exp(lam * (np.power(M, rho) - kappa)))
+
+
+@dataclass(frozen=True)
+class MemoryKernel:
+    name: str
+    f: Callable
+    kind: int = USER
+
+
+KERNELS: Dict[str, MemoryKernel] = {}
+
+
+def register_kernel(name: str, f: Callable, kind: int = USER) -> MemoryKernel:
+    """Add f(M, lam, rho, kappa) to the registry under name; returns its MemoryKernel."""
+    if name in KERNELS and KERNELS[name].f is not f:
+        raise ValueError(f"memory kernel {name!r} is already registered")
+    KERNELS[name] = MemoryKernel(name, f, kind)
+    return KERNELS[name]
+
+
+register_kernel("exp", stretched_exp, EXP)
+register_kernel("rational", rational_power, RATIONAL)
+register_kernel("logistic", logistic, LOGISTIC)
+
+
+def get_kernel(kernel: Union[str, Callable, MemoryKernel] = "exp") -> MemoryKernel:
+    """Resolve a registry name, a MemoryKernel or a bare callable (used as a user kernel)."""
+    if isinstance(kernel, MemoryKernel):
+        return kernel
+    if isinstance(kernel, str):
+        try:
+            return KERNELS[kernel]
+        except KeyError:
+            raise ValueError(f"unknown memory kernel {kernel!r}; registered: {sorted(KERNELS)}") from None
+    if callable(kernel):
+        return MemoryKernel(getattr(kernel, "__name__", "user"), kernel, USER)
+    raise TypeError(f"memory kernel must be a name, a MemoryKernel or a callable, got {type(kernel).__name__}")
@@ -1,27 +1,45 @@
 import numpy as np
 
+from .grid_tables import baseline_term
+from .recurrence import run_recurrence
+from .series_cache import cached_series
 
-def ltp_response(steps: int,
+
+def _ltp_segment(start: int,
+                 stop: int,
                  alpha: float,
                  beta: float,
                  lam: float,
                  rho: float,
-                 stim: float = 1.0) -> dict:
+                 stim: float = 1.0,
+                 M0: float = 0.0,
+                 mode: str = "auto",
+                 share: bool = True) -> dict:
     # Simplified mapping: potentiation increments follow threshold series with memory
+    n = np.arange(start + 2, stop + 2, dtype=float)
+    b = stim * baseline_term(n, alpha, beta, share=share)
+    a, M = run_recurrence(b, lam, rho, M0=M0, mode=mode)
+    return {"delta_W": a, "M": M}
+
+
+def ltp_response(steps: int,
+                 alpha: float,
+                 beta: float,
+                 lam: float,
+                 rho: float,
+                 stim: float = 1.0,
+                 mode: str = "auto",
+                 cache: bool = False) -> dict:
     n = np.arange(2, steps + 2, dtype=float)
-    ln_n = np.log(n)
-    ln_n = np.where(ln_n == 0.0, np.finfo(float).tiny, ln_n)
-    b = stim / (np.power(n, alpha) * np.power(ln_n, beta))
-    a = np.empty_like(b)
-    M = np.empty_like(b)
-    accum = 0.0
-    for i in range(steps):
-        fm = np.exp(-lam * (accum ** rho))
-        ai = b[i] * fm
-        a[i] = ai
-        accum += ai
-        M[i] = accum
-    return {"n": n, "delta_W": a, "W": M}
+    if cache:
+        out = cached_series("ltp_response",
+                            {"alpha": alpha, "beta": beta, "lam": lam, "rho": rho, "stim": stim},
+                            steps,
+                            lambda start, stop, M0: _ltp_segment(start, stop, alpha, beta, lam, rho,
+                                                                 stim, M0=M0, mode=mode, share=False))
+    else:
+        out = _ltp_segment(0, steps, alpha, beta, lam, rho, stim, mode=mode)
+    return {"n": n, "delta_W": out["delta_W"], "W": out["M"]}
 
 
 if __name__ == "__main__":
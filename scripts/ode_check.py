@@ -1,22 +1,27 @@
 import numpy as np
 from typing import Callable
 
+from .kernels import get_kernel
+
 
 def baseline_b(n: float, alpha: float, beta: float) -> float:
     return 1.0 / (np.power(n, alpha) * np.power(np.log(max(n, 2.0)), beta))
 
 
-def f_memory(M: float, lam: float, rho: float) -> float:
-    return float(np.exp(-lam * (M ** rho)))
-
-
 def integrate_ode(N: int,
                   alpha: float,
                   beta: float,
                   lam: float,
                   rho: float,
-                  h: float = 2.0) -> float:
+                  h: float = 2.0,
+                  kernel="exp",
+                  kappa: float = 1.0) -> float:
     # dM/dn = b(n) f(M)
+    f = get_kernel(kernel).f
+
+    def f_memory(M: float, lam: float, rho: float) -> float:
+        return float(f(M, lam, rho, kappa))
+
     M = 0.0
     n = 2.0
     for _ in range(N):
@@ -1,8 +1,10 @@
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 
-from complex_breathing import complex_series
+from .complex_breathing import complex_series
+from .decimate import plot_line
+from .instrument import RunRecorder, stage
+from .spectral import OnlineLinearFit, WelchPSD, log_periodic_psd
 
 
 def ensure_figdir(path: str = "figures") -> str:
@@ -17,71 +19,115 @@ def analyze_phase(N: int = 300000,
                   beta_i: float = 2.9,
                   lam: float = 1e-4,
                   rho: float = 1.0,
-                  figdir: str = "figures"):
-    n, a, phase, M = complex_series(N, alpha_r, beta_r, alpha_i, beta_i, lam, rho)
+                  figdir: str = "figures",
+                  cache: bool = True,
+                  fit_window: int = 20000,
+                  block: int = 1 << 16,
+                  nperseg: int = 4096):
+    import matplotlib.pyplot as plt
+
+    with stage("series", terms=N):
+        n, a, phase, M = complex_series(N, alpha_r, beta_r, alpha_i, beta_i, lam, rho, cache=cache)
+    # The slope plots only use the first 10k samples, so only that slice of
+    # the (memory-mapped) series is read here
+    head = min(N, 10001)
     # Unwrap phase to avoid 2pi jumps
-    ph = np.unwrap(phase)
+    ph = np.unwrap(phase[:head])
     # Local slope d(phase)/d(ln n) ~ alpha_i + beta_i / ln n
-    ln_n = np.log(n)
+    ln_n = np.log(n[:head])
     # Numerical derivative wrt ln n
     dphi = np.gradient(ph, ln_n)
 
     # Plot phase vs ln n and derivative
-    plt.figure(figsize=(8, 4))
-    plt.plot(ln_n[:5000], ph[:5000])
-    plt.xlabel("ln n")
-    plt.ylabel("phase")
-    plt.title("Phase vs ln n (first 5k)")
-    plt.tight_layout()
-    plt.savefig(os.path.join(figdir, "phase_vs_lnn.png"), dpi=150)
-    plt.close()
+    with stage("render"):
+        plt.figure(figsize=(8, 4))
+        plot_line(ln_n[:5000], ph[:5000])
+        plt.xlabel("ln n")
+        plt.ylabel("phase")
+        plt.title("Phase vs ln n (first 5k)")
+        plt.tight_layout()
+        plt.savefig(os.path.join(figdir, "phase_vs_lnn.png"), dpi=150)
+        plt.close()
+
+        plt.figure(figsize=(8, 4))
+        plot_line(ln_n[100:10000], dphi[100:10000])
+        plt.xlabel("ln n")
+        plt.ylabel("d phase / d ln n")
+        plt.title("Local slope of phase (indicative of alpha_i + beta_i/ln n)")
+        plt.tight_layout()
+        plt.savefig(os.path.join(figdir, "phase_slope.png"), dpi=150)
+        plt.close()
 
-    plt.figure(figsize=(8, 4))
-    plt.plot(ln_n[100:10000], dphi[100:10000])
-    plt.xlabel("ln n")
-    plt.ylabel("d phase / d ln n")
-    plt.title("Local slope of phase (indicative of alpha_i + beta_i/ln n)")
-    plt.tight_layout()
-    plt.savefig(os.path.join(figdir, "phase_slope.png"), dpi=150)
-    plt.close()
+    # Spectrum of the real and imaginary parts, Welch-averaged over the series
+    # in blocks so memory stays O(block) however large N is
+    with stage("fft", terms=N):
+        welch_r, welch_i = WelchPSD(nperseg), WelchPSD(nperseg)
+        for lo in range(0, N, block):
+            seg = np.asarray(a[lo:lo + block])
+            welch_r.push(seg.real)
+            welch_i.push(seg.imag)
+        freqs, psd_r = welch_r.result()
+        _, psd_i = welch_i.result()
+    with stage("render"):
+        plt.figure(figsize=(8, 4))
+        plot_line(freqs[1:], psd_r[1:], plot=plt.semilogy, label='real')
+        plot_line(freqs[1:], psd_i[1:], plot=plt.semilogy, label='imag')
+        plt.xlabel("frequency (index^-1)")
+        plt.ylabel("PSD of a_n components")
+        plt.title("Spectrum of complex series a_n (real/imag, Welch)")
+        plt.legend()
+        plt.tight_layout()
+        plt.savefig(os.path.join(figdir, "complex_series_spectrum.png"), dpi=150)
+        plt.close()
 
-    # Spectrum of complex series (real/imag)
-    # Use real/imag parts separately for FFT
-    a_real = np.real(a)
-    a_imag = np.imag(a)
-    a_real_c = a_real - np.mean(a_real)
-    a_imag_c = a_imag - np.mean(a_imag)
-    A_r = np.fft.rfft(a_real_c)
-    A_i = np.fft.rfft(a_imag_c)
-    freqs = np.fft.rfftfreq(len(a_real_c), d=1.0)
-    plt.figure(figsize=(8, 4))
-    plt.semilogy(freqs[1:5000], np.abs(A_r[1:5000]), label='real')
-    plt.semilogy(freqs[1:5000], np.abs(A_i[1:5000]), label='imag')
-    plt.xlabel("frequency (index^-1)")
-    plt.ylabel("|FFT| of a_n components")
-    plt.title("Spectrum of complex series a_n (real/imag)")
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(os.path.join(figdir, "complex_series_spectrum.png"), dpi=150)
-    plt.close()
+    # Log-periodic spectrum: a_n / |a_n| resampled onto a uniform ln n grid
+    # and Welch-averaged, streamed over the series in blocks
+    with stage("log_spectrum", terms=N):
+        f_u, psd_u = log_periodic_psd(((n[i:i + block], a[i:i + block]) for i in range(0, N, block)))
+    with stage("render"):
+        plt.figure(figsize=(8, 4))
+        plot_line(f_u, psd_u, plot=plt.semilogy)
+        plt.axvline(-alpha_i / (2 * np.pi), color="k", ls="--", lw=0.8, label="-alpha_i / 2pi")
+        plt.xlabel("frequency (cycles per unit ln n)")
+        plt.ylabel("PSD of a_n / |a_n|")
+        plt.title("Log-periodic spectrum (Welch on a uniform ln n grid)")
+        plt.legend()
+        plt.tight_layout()
+        plt.savefig(os.path.join(figdir, "complex_series_logspectrum.png"), dpi=150)
+        plt.close()
 
-    # Robust linear fit of phase vs ln n over a window
-    k = 20000
-    x = ln_n[100:100 + k]
-    y = ph[100:100 + k]
-    A = np.vstack([x, np.ones_like(x)]).T
-    m, c = np.linalg.lstsq(A, y, rcond=None)[0]
+    # Linear fit of phase vs ln n over a window, accumulated block by block
+    # (phase unwrapped from n = 2 with the last value carried across blocks)
+    fit = OnlineLinearFit()
+    lo_fit, hi_fit = 100, min(N, 100 + fit_window)
+    last = None
+    with stage("phase_fit", terms=hi_fit):
+        for lo in range(0, hi_fit, block):
+            hi = min(hi_fit, lo + block)
+            seg = np.asarray(phase[lo:hi])
+            seg = np.unwrap(seg if last is None else np.concatenate(([last], seg)))[-(hi - lo):]
+            last = seg[-1]
+            if hi > lo_fit:
+                start = max(lo, lo_fit)
+                fit.push(np.log(n[start:hi]), seg[start - lo:])
+    m, c = fit.slope, fit.intercept
     with open(os.path.join(figdir, "phase_fit.txt"), "w", encoding="utf-8") as f:
         f.write(f"slope_over_window≈{m}\nintercept≈{c}\n")
 
 
 if __name__ == "__main__":
+    import inspect
+
     figdir = ensure_figdir()
-    analyze_phase(figdir=figdir)
-    print({"saved": [
+    saved = [
         "figures/phase_vs_lnn.png",
         "figures/phase_slope.png",
         "figures/complex_series_spectrum.png",
-    ]})
-
-
+        "figures/complex_series_logspectrum.png",
+        "figures/phase_fit.txt",
+    ]
+    params = {k: p.default for k, p in inspect.signature(analyze_phase).parameters.items()}
+    with RunRecorder("phase_analysis", params, outputs=saved, figdir=figdir) as rec:
+        rec.terms = params["N"]
+        analyze_phase(figdir=figdir)
+    print({"saved": saved + [rec.sidecar]})
@@ -1,7 +1,7 @@
 import os
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
+
+from .result_store import load_table, pivot, store_path
 
 
 def ensure_figdir(path: str = "figures") -> str:
@@ -12,19 +12,16 @@ def ensure_figdir(path: str = "figures") -> str:
 def heatmap_from_csv(csv_path: str,
                      value_col: str,
                      out_png: str,
-                     cmap: str = "viridis"):
-    df = pd.read_csv(csv_path)
-    # pivot to grid
-    a_vals = np.sort(df["alpha"].astype(float).unique())
-    b_vals = np.sort(df["beta"].astype(float).unique())
-    grid = np.zeros((len(a_vals), len(b_vals)))
-    for i, a in enumerate(a_vals):
-        for j, b in enumerate(b_vals):
-            sub = df[(df["alpha"].astype(float) == a) & (df["beta"].astype(float) == b)]
-            if not sub.empty:
-                grid[i, j] = float(sub.iloc[0][value_col])
-            else:
-                grid[i, j] = np.nan
+                     cmap: str = "viridis",
+                     where: dict | None = None):
+    """Heatmap over (alpha, beta) from a sweep CSV or its result store (.npz).
+
+    where fixes other axes, e.g. {"lam": 1e-4, "rho": 1.0}.
+    """
+    import matplotlib.pyplot as plt
+
+    table = load_table(csv_path, ["alpha", "beta", value_col], **(where or {}))
+    a_vals, b_vals, grid = pivot(table, "alpha", "beta", value_col)
     plt.figure(figsize=(6.5, 5))
     im = plt.imshow(grid, origin='lower', aspect='auto', cmap=cmap,
                     extent=[b_vals.min(), b_vals.max(), a_vals.min(), a_vals.max()])
@@ -37,14 +34,47 @@ def heatmap_from_csv(csv_path: str,
     plt.close()
 
 
-if __name__ == "__main__":
-    figdir = ensure_figdir()
+def heatmap_from_scattered_csv(csv_path: str,
+                               value_col: str,
+                               out_png: str,
+                               cmap: str = "viridis",
+                               resolution: int = 257):
+    # For adaptive sweeps: points lie on a refined subset of a lattice, so
+    # interpolate onto a regular grid and overlay the sampled points
+    import matplotlib.pyplot as plt
+    import pandas as pd
+    from scipy.interpolate import griddata
+
+    df = pd.read_csv(csv_path)
+    a = df["alpha"].to_numpy(dtype=float)
+    b = df["beta"].to_numpy(dtype=float)
+    A, B = np.meshgrid(np.linspace(a.min(), a.max(), resolution),
+                       np.linspace(b.min(), b.max(), resolution),
+                       indexing="ij")
+    grid = griddata((a, b), df[value_col].to_numpy(dtype=float), (A, B), method="linear")
+    plt.figure(figsize=(6.5, 5))
+    im = plt.imshow(grid, origin='lower', aspect='auto', cmap=cmap,
+                    extent=[b.min(), b.max(), a.min(), a.max()])
+    plt.colorbar(im, label=value_col)
+    plt.scatter(b, a, s=2, c="k", alpha=0.4)
+    plt.xlabel("beta")
+    plt.ylabel("alpha")
+    plt.title(f"Critical Sweep (adaptive, {len(df)} points): {value_col}")
+    plt.tight_layout()
+    plt.savefig(out_png, dpi=150)
+    plt.close()
+
+
+def critical_heatmaps(figdir: str = "figures") -> list:
+    """Both heatmaps of figdir/critical_sweep.csv, read from its result store when there is one."""
     csv = os.path.join(figdir, "critical_sweep.csv")
-    heatmap_from_csv(csv, "windowed_growth", os.path.join(figdir, "critical_heatmap_windowed_growth.png"))
-    heatmap_from_csv(csv, "tail_mean", os.path.join(figdir, "critical_heatmap_tail_mean.png"))
-    print({"saved": [
-        "figures/critical_heatmap_windowed_growth.png",
-        "figures/critical_heatmap_tail_mean.png",
-    ]})
+    source = store_path(csv) if os.path.exists(store_path(csv)) else csv
+    saved = []
+    for col in ("windowed_growth", "tail_mean"):
+        saved.append(os.path.join(figdir, f"critical_heatmap_{col}.png"))
+        heatmap_from_csv(source, col, saved[-1])
+    return saved
 
 
+if __name__ == "__main__":
+    print({"saved": critical_heatmaps(ensure_figdir())})
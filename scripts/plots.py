@@ -1,11 +1,13 @@
 import os
 import numpy as np
-import matplotlib.pyplot as plt
 
-from thermo_entropy import entropy_series
-from cosmology_memory import H_series
-from complex_breathing import complex_series
-from neural_thresholds import ltp_response
+from .thermo_entropy import entropy_series
+from .cosmology_memory import H_series
+from .complex_breathing import complex_series
+from .neural_thresholds import ltp_response
+from .decimate import plot_line
+from .instrument import RunRecorder, stage
+from .spectral import WelchPSD
 
 
 def ensure_figdir(path: str = "figures") -> str:
@@ -13,96 +15,117 @@ def ensure_figdir(path: str = "figures") -> str:
     return path
 
 
-def plot_entropy(figdir: str):
+def plot_entropy(figdir: str, N: int = 150000):
+    import matplotlib.pyplot as plt
+
     cases = [(0.9, 0.0, "alpha=0.9, beta=0.0"), (1.0, 1.0, "alpha=1.0, beta=1.0"), (1.1, 0.0, "alpha=1.1, beta=0.0")]
     plt.figure(figsize=(8, 5))
     for alpha, beta, label in cases:
-        out = entropy_series(150000, alpha, beta, lam=1e-4, rho=1.0)
+        with stage("series", terms=N):
+            out = entropy_series(N, alpha, beta, lam=1e-4, rho=1.0, cache=True)
         n = out["n"]
         S = out["S"]
-        plt.plot(n, S, label=label)
-    plt.xlabel("n")
-    plt.ylabel("S(n)")
-    plt.title("Entropy Accumulation across Regimes")
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(os.path.join(figdir, "entropy_S.png"), dpi=150)
-    plt.close()
-
-
-def plot_cosmology(figdir: str):
-    H = H_series(200000, alpha=1.0, beta=1.0, lam=1e-4, rho=1.0, H0=1.0)
-    t = np.arange(2, 200000 + 2)
-    plt.figure(figsize=(8, 5))
-    plt.plot(t, H)
-    plt.xlabel("t (index)")
-    plt.ylabel("H(t) (model units)")
-    plt.title("Cosmology: Memory-Weighted Expansion H(t)")
-    plt.tight_layout()
-    plt.savefig(os.path.join(figdir, "cosmology_H.png"), dpi=150)
-    plt.close()
-
-
-def plot_complex_breathing(figdir: str):
-    N = 200000
-    n, a, phase, M = complex_series(N=N,
-                                    alpha_r=1.0,
-                                    beta_r=1.0,
-                                    alpha_i=2.8,
-                                    beta_i=2.9,
-                                    lam=1e-4,
-                                    rho=1.0)
-    mag = np.abs(a)
-    plt.figure(figsize=(8, 4))
-    plt.plot(n[:2000], mag[:2000])
-    plt.xlabel("n")
-    plt.ylabel("|a_n|")
-    plt.title("Complex Breathing: Magnitude (first 2k samples)")
-    plt.tight_layout()
-    plt.savefig(os.path.join(figdir, "breathing_magnitude.png"), dpi=150)
-    plt.close()
-
-    # Simple spectrum of magnitude (for visualization only)
-    mag_centered = mag - np.mean(mag)
-    fft = np.fft.rfft(mag_centered)
-    freqs = np.fft.rfftfreq(len(mag_centered), d=1.0)
-    psd = np.abs(fft)
-    plt.figure(figsize=(8, 4))
-    plt.semilogy(freqs[1:5000], psd[1:5000])
-    plt.xlabel("frequency (index^-1)")
-    plt.ylabel("|FFT(|a_n|)|")
-    plt.title("Complex Breathing: Spectrum of |a_n|")
-    plt.tight_layout()
-    plt.savefig(os.path.join(figdir, "breathing_spectrum.png"), dpi=150)
-    plt.close()
-
-
-def plot_neural(figdir: str):
-    out = ltp_response(200000, alpha=1.0, beta=1.0, lam=1e-3, rho=1.0, stim=1.0)
+        with stage("render"):
+            plot_line(n, S, label=label)
+    with stage("render"):
+        plt.xlabel("n")
+        plt.ylabel("S(n)")
+        plt.title("Entropy Accumulation across Regimes")
+        plt.legend()
+        plt.tight_layout()
+        plt.savefig(os.path.join(figdir, "entropy_S.png"), dpi=150)
+        plt.close()
+
+
+def plot_cosmology(figdir: str, N: int = 200000):
+    import matplotlib.pyplot as plt
+
+    with stage("series", terms=N):
+        H = H_series(N, alpha=1.0, beta=1.0, lam=1e-4, rho=1.0, H0=1.0, cache=True)
+    t = np.arange(2, N + 2)
+    with stage("render"):
+        plt.figure(figsize=(8, 5))
+        plot_line(t, H)
+        plt.xlabel("t (index)")
+        plt.ylabel("H(t) (model units)")
+        plt.title("Cosmology: Memory-Weighted Expansion H(t)")
+        plt.tight_layout()
+        plt.savefig(os.path.join(figdir, "cosmology_H.png"), dpi=150)
+        plt.close()
+
+
+def plot_complex_breathing(figdir: str, N: int = 200000, nperseg: int = 4096, block: int = 1 << 16):
+    import matplotlib.pyplot as plt
+
+    with stage("series", terms=N):
+        n, a, phase, M = complex_series(N=N,
+                                        alpha_r=1.0,
+                                        beta_r=1.0,
+                                        alpha_i=2.8,
+                                        beta_i=2.9,
+                                        lam=1e-4,
+                                        rho=1.0,
+                                        cache=True)
+    # a is a read-only memory map of the cached artifact; slices are read lazily
+    with stage("render"):
+        plt.figure(figsize=(8, 4))
+        plot_line(n[:2000], np.abs(a[:2000]))
+        plt.xlabel("n")
+        plt.ylabel("|a_n|")
+        plt.title("Complex Breathing: Magnitude (first 2k samples)")
+        plt.tight_layout()
+        plt.savefig(os.path.join(figdir, "breathing_magnitude.png"), dpi=150)
+        plt.close()
+
+    # Spectrum of |a_n| (for visualization only), Welch-averaged block by block
+    with stage("fft", terms=N):
+        welch = WelchPSD(nperseg)
+        for lo in range(0, N, block):
+            welch.push(np.abs(a[lo:lo + block]))
+        freqs, psd = welch.result()
+    with stage("render"):
+        plt.figure(figsize=(8, 4))
+        plot_line(freqs[1:], psd[1:], plot=plt.semilogy)
+        plt.xlabel("frequency (index^-1)")
+        plt.ylabel("PSD of |a_n|")
+        plt.title("Complex Breathing: Spectrum of |a_n| (Welch)")
+        plt.tight_layout()
+        plt.savefig(os.path.join(figdir, "breathing_spectrum.png"), dpi=150)
+        plt.close()
+
+
+def plot_neural(figdir: str, N: int = 200000):
+    import matplotlib.pyplot as plt
+
+    with stage("series", terms=N):
+        out = ltp_response(N, alpha=1.0, beta=1.0, lam=1e-3, rho=1.0, stim=1.0, cache=True)
     n = out["n"]
     W = out["W"]
-    plt.figure(figsize=(8, 5))
-    plt.plot(n, W)
-    plt.xlabel("n")
-    plt.ylabel("A(n) ~ W(n)")
-    plt.title("Awareness Accumulation (Model)")
-    plt.tight_layout()
-    plt.savefig(os.path.join(figdir, "awareness_accumulation.png"), dpi=150)
-    plt.close()
+    with stage("render"):
+        plt.figure(figsize=(8, 5))
+        plot_line(n, W)
+        plt.xlabel("n")
+        plt.ylabel("A(n) ~ W(n)")
+        plt.title("Awareness Accumulation (Model)")
+        plt.tight_layout()
+        plt.savefig(os.path.join(figdir, "awareness_accumulation.png"), dpi=150)
+        plt.close()
 
 
 if __name__ == "__main__":
     figdir = ensure_figdir()
-    plot_entropy(figdir)
-    plot_cosmology(figdir)
-    plot_complex_breathing(figdir)
-    plot_neural(figdir)
-    print({"saved": [
+    saved = [
         "figures/entropy_S.png",
         "figures/cosmology_H.png",
         "figures/breathing_magnitude.png",
         "figures/breathing_spectrum.png",
         "figures/awareness_accumulation.png",
-    ]})
-
-
+    ]
+    with RunRecorder("plots", {"entropy_N": 150000, "H_N": 200000, "complex_N": 200000, "ltp_N": 200000},
+                     outputs=saved, figdir=figdir) as rec:
+        rec.terms = 3 * 150000 + 3 * 200000
+        plot_entropy(figdir)
+        plot_cosmology(figdir)
+        plot_complex_breathing(figdir)
+        plot_neural(figdir)
+    print({"saved": saved + [rec.sidecar]})
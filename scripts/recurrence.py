@@ -0,0 +1,411 @@
+import importlib.util
+import math
+import numpy as np
+from typing import Callable, Iterator, Tuple
+
+from .kernels import EXP, RATIONAL, USER, get_kernel, stretched_exp
+
+# numba is optional (the NumPy path covers it) and slow to import, so it is
+# only loaded when a compiled loop is first needed
+HAVE_NUMBA = importlib.util.find_spec("numba") is not None
+
+
+MODES = ("auto", "numba", "numpy", "reference")
+DEFAULT_BLOCK = 1 << 20
+# "float64": the plain recurrence. "float32": terms stored as float32 (half the
+# memory traffic of a), with M accumulated in float64 plus the running sum of
+# the exact rounding error of every addition (Neumaier compensation), so M is
+# at least as accurate as with "float64". "longdouble": the per-element loop
+# in np.longdouble, slow and meant as the error reference (80-bit extended on
+# x86; on platforms without a wider type it is plain float64).
+PRECISIONS = ("float64", "float32", "longdouble")
+
+
+def f_memory(M: np.ndarray, lam: float, rho: float) -> np.ndarray:
+    return stretched_exp(M, lam, rho)
+
+
+def _reference_recurrence(b: np.ndarray,
+                          lam: float,
+                          rho: float,
+                          M0: float,
+                          f: Callable = stretched_exp,
+                          kappa: float = 1.0) -> Tuple[np.ndarray, np.ndarray, float]:
+    # Original per-element loop, kept as the cross-check for the fast paths
+    a = np.empty_like(b)
+    M = np.empty_like(b)
+    accum = M0
+    for i in range(len(b)):
+        fm = f(np.array([accum]), lam, rho, kappa)[0]
+        ai = b[i] * fm
+        a[i] = ai
+        accum += ai
+        M[i] = accum
+    return a, M, accum
+
+
+def _compensate(M0, a: np.ndarray, M: np.ndarray) -> np.ndarray:
+    # Add the running sum of the TwoSum error of each M[i-1] + a[i] = M[i] to M
+    prev = np.concatenate(([M0], M[:-1]))
+    z = M - prev
+    return M + np.cumsum((prev - (M - z)) + (a - z))
+
+
+def _numpy_recurrence(b: np.ndarray,
+                      lam: float,
+                      rho: float,
+                      M0: float,
+                      f: Callable = stretched_exp,
+                      kappa: float = 1.0,
+                      first_block: int = 64,
+                      max_block: int = 65536) -> Tuple[np.ndarray, np.ndarray, float]:
+    # Blockwise fixed-point iteration: inside a block, guess the accumulator
+    # seen by each term, recompute the terms, re-accumulate, repeat. Term i only
+    # depends on terms < i, so each sweep fixes at least one more entry and the
+    # loop is exact after len(block) + 1 sweeps; with small lam it settles in a
+    # handful. Blocks grow geometrically because early terms are the largest.
+    N = len(b)
+    a = np.empty_like(b)
+    M = np.empty_like(b)
+    accum = float(M0)
+    start = 0
+    size = first_block
+    while start < N:
+        stop = min(N, start + size)
+        bb = b[start:stop]
+        seen = np.full(stop - start, accum)
+        for _ in range(stop - start + 1):
+            ai = bb * f(seen, lam, rho, kappa)
+            acc = np.add.accumulate(np.concatenate(([accum], ai)))
+            if np.array_equal(acc[:-1], seen):
+                break
+            seen = acc[:-1]
+        a[start:stop] = ai
+        M[start:stop] = acc[1:]
+        accum = float(acc[-1])
+        start = stop
+        size = min(2 * size, max_block)
+    return a, M, accum
+
+
+# Compiled loop. Rather than evaluating f(M_n) from scratch each step (a pow
+# and an exp), it carries f, and P = M^rho, forward multiplicatively, e.g. for
+# the exponential kernel exp(-lam M_{n+1}) = exp(-lam M_n) * exp(-lam a_n).
+# The step factors are cubic Taylor polynomials, whose truncation error stays
+# under an ulp while their argument is below TAYLOR_MAX. The terms go in
+# blocks of RESYNC: the inner loop applies the Taylor steps without checks and
+# only tracks the largest argument; a block where it reached TAYLOR_MAX is
+# redone with f evaluated exactly every step, and after each block f is
+# recomputed exactly to bound rounding drift. Results agree with the per-step
+# evaluation to ~1e-13 relative.
+TAYLOR_MAX = 1e-4
+RESYNC = 1024
+
+
+def _kernel_value(kind, P, lam, kappa):
+    if kind == EXP:
+        return math.exp(-lam * P)
+    if kind == RATIONAL:
+        return (1.0 + lam * P) ** (-kappa)
+    z = lam * (P - kappa)
+    if z > 700.0:
+        return 0.0
+    return (1.0 + math.exp(-lam * kappa)) / (1.0 + math.exp(z))
+
+
+def _accumulate(accum, comp, ai, compensated):
+    # accum + ai, and with compensated the TwoSum error added to comp
+    new = accum + ai
+    if compensated:
+        z = new - accum
+        comp += (accum - (new - z)) + (ai - z)
+    return new, comp
+
+
+def _taylor_block(b, lo, hi, kind, linear, lam, accum, comp, P, f, R, E, C, c, d, a, M, compensated):
+    # Terms lo..hi-1 with Taylor-propagated f; returns (accum, comp, largest step argument).
+    # R = 1 / (1 + lam P) for the rational kernel. Only f (and R, E) carry a
+    # step-to-step dependency, so the factors are laid out to keep that chain
+    # short: terms independent of f come first and the cubics are split
+    # (Estrin) instead of nested.
+    worst = 0.0
+    for i in range(lo, hi):
+        bi = b[i]
+        ai = bi * f
+        a[i] = ai
+        if linear:
+            dP = ai
+            y = (lam * bi) * f
+        else:
+            r = bi / accum
+            u = r * f
+            worst = max(worst, u)
+            s = c[0] + u * (c[1] + u * c[2])
+            dP = P * (u * s)
+            y = ((lam * P * r) * f) * s
+        new, comp = _accumulate(accum, comp, ai, compensated)
+        M[i] = new + comp
+        accum = new
+        P += dP
+        worst = max(worst, abs(y))
+        y2 = y * y
+        if kind == EXP and linear:
+            # f e^{-g f} as a polynomial in f itself, one multiply shorter
+            g = lam * bi
+            h2 = 0.5 * g * g
+            f += (f * f) * (f * (h2 - f * (h2 * g * (1.0 / 3.0))) - g)
+        elif kind == EXP:
+            f *= (1.0 - y) + y2 * (0.5 - y * (1.0 / 6.0))
+        elif kind == RATIONAL:
+            v = y * R
+            v2 = v * v
+            f *= (1.0 + d[0] * v) + v2 * (d[1] + d[2] * v)
+            R *= (1.0 - v) + v2 * (1.0 - v)
+        else:
+            E *= (1.0 + y) + y2 * (0.5 + y * (1.0 / 6.0))
+            f = C / (1.0 + E)
+    return accum, comp, worst
+
+
+def _exact_block(b, lo, hi, kind, lam, rho, kappa, accum, comp, f, a, M, compensated):
+    # Terms lo..hi-1 with f evaluated exactly every step
+    for i in range(lo, hi):
+        ai = b[i] * f
+        a[i] = ai
+        accum, comp = _accumulate(accum, comp, ai, compensated)
+        M[i] = accum + comp
+        f = _kernel_value(kind, accum if rho == 1.0 else accum ** rho, lam, kappa)
+    return accum, comp
+
+
+def _kernel_row(b, kind, lam, rho, kappa, M0, a, M, compensated):
+    L = b.shape[0]
+    # (1 + u)^rho - 1 and (1 + v)^(-kappa) - 1 to third order
+    c = (rho, rho * (rho - 1.0) / 2.0, rho * (rho - 1.0) * (rho - 2.0) / 6.0)
+    s = -kappa
+    d = (s, s * (s - 1.0) / 2.0, s * (s - 1.0) * (s - 2.0) / 6.0)
+    C = 1.0 + math.exp(-lam * kappa)
+    accum = M0
+    comp = 0.0
+    for lo in range(0, L, RESYNC):
+        hi = min(L, lo + RESYNC)
+        P = accum if rho == 1.0 else accum ** rho
+        f = _kernel_value(kind, P, lam, kappa)
+        worst = math.inf
+        if rho == 1.0 or accum > 0.0:
+            new, new_comp, worst = _taylor_block(b, lo, hi, kind, rho == 1.0, lam, accum, comp, P, f,
+                                                 1.0 / (1.0 + lam * P), math.exp(min(lam * (P - kappa), 700.0)),
+                                                 C, c, d, a, M, compensated)
+        if worst < TAYLOR_MAX:
+            accum, comp = new, new_comp
+        else:
+            accum, comp = _exact_block(b, lo, hi, kind, lam, rho, kappa, accum, comp, f, a, M, compensated)
+    return accum + comp
+
+
+def _loop_recurrence(b, kind, lam, rho, kappa, M0, a, M, compensated):
+    return _kernel_row(b, kind, lam, rho, kappa, M0, a, M, compensated)
+
+
+def _reference_recurrence_batch(b, lam, rho, M0, kernels, kappa):
+    a = np.empty_like(b)
+    M = np.empty_like(b)
+    for k in range(b.shape[0]):
+        a[k], M[k], _ = _reference_recurrence(b[k], lam[k], rho[k], M0[k], kernels[k].f, kappa[k])
+    return a, M
+
+
+def _kernel_batch(seen, lam, rho, kappa, groups):
+    out = np.empty_like(seen)
+    for f, rows in groups:
+        out[rows] = f(seen[rows], lam[rows], rho[rows], kappa[rows])
+    return out
+
+
+def _numpy_recurrence_batch(b: np.ndarray,
+                            lam: np.ndarray,
+                            rho: np.ndarray,
+                            M0: np.ndarray,
+                            kernels: list,
+                            kappa: np.ndarray,
+                            first_block: int = 64,
+                            max_block: int = 16384) -> Tuple[np.ndarray, np.ndarray]:
+    # Same fixed-point scheme as _numpy_recurrence, one row per configuration;
+    # rows sharing a kernel are evaluated together
+    K, N = b.shape
+    lam = lam[:, None]
+    rho = rho[:, None]
+    kappa = kappa[:, None]
+    groups = {}
+    for k, kern in enumerate(kernels):
+        groups.setdefault(kern.f, []).append(k)
+    groups = [(f, np.array(rows)) for f, rows in groups.items()]
+    a = np.empty_like(b)
+    M = np.empty_like(b)
+    accum = M0.astype(float)
+    start = 0
+    size = first_block
+    while start < N:
+        stop = min(N, start + size)
+        bb = b[:, start:stop]
+        seen = np.repeat(accum[:, None], stop - start, axis=1)
+        for _ in range(stop - start + 1):
+            ai = bb * _kernel_batch(seen, lam, rho, kappa, groups)
+            acc = np.add.accumulate(np.concatenate((accum[:, None], ai), axis=1), axis=1)
+            if np.array_equal(acc[:, :-1], seen):
+                break
+            seen = acc[:, :-1]
+        a[:, start:stop] = ai
+        M[:, start:stop] = acc[:, 1:]
+        accum = acc[:, -1].copy()
+        start = stop
+        size = min(2 * size, max_block)
+    return a, M
+
+
+def _loop_recurrence_batch(b, kind, lam, rho, kappa, M0, a, M):
+    # Row by row over the block: callers advance the batch in lockstep one
+    # block of n at a time, and contiguous rows keep the loop cache-friendly
+    K = b.shape[0]
+    out = np.empty(K)
+    for k in range(K):
+        out[k] = _kernel_row(b[k], kind[k], lam[k], rho[k], kappa[k], M0[k], a[k], M[k], False)
+    return out
+
+
+_compiled = None
+
+
+def _compiled_loops():
+    """(single, batch) compiled loops, built on first use from numba's on-disk cache."""
+    global _compiled, _kernel_value, _accumulate, _taylor_block, _exact_block, _kernel_row
+    if _compiled is None:
+        from numba import njit
+        # The loops call these helpers, so they are compiled first
+        _kernel_value = njit(cache=True, nogil=True)(_kernel_value)
+        _accumulate = njit(cache=True, nogil=True)(_accumulate)
+        # FMA contraction only; the loop's TwoSum sits in _accumulate, compiled without it
+        _taylor_block = njit(cache=True, nogil=True, fastmath={"contract"})(_taylor_block)
+        _exact_block = njit(cache=True, nogil=True)(_exact_block)
+        _kernel_row = njit(cache=True, nogil=True)(_kernel_row)
+        _compiled = (njit(cache=True, nogil=True)(_loop_recurrence),
+                     njit(cache=True, nogil=True)(_loop_recurrence_batch))
+    return _compiled
+
+
+def resolve_mode(mode: str = "auto", kernel=None) -> str:
+    """Engine for mode; user-supplied kernels have no compiled path, so "auto" picks NumPy."""
+    if mode not in MODES:
+        raise ValueError(f"unknown recurrence mode {mode!r}; expected one of {MODES}")
+    compiled = kernel is None or get_kernel(kernel).kind != USER
+    if mode == "auto":
+        return "numba" if HAVE_NUMBA and compiled else "numpy"
+    if mode == "numba" and not HAVE_NUMBA:
+        raise RuntimeError("recurrence mode 'numba' requested but numba is not installed")
+    if mode == "numba" and not compiled:
+        raise ValueError(f"memory kernel {get_kernel(kernel).name!r} has no compiled path; use mode='numpy'")
+    return mode
+
+
+def baseline_dtype(precision: str = "float64"):
+    """The dtype to compute baseline terms in for a PRECISIONS entry."""
+    if precision not in PRECISIONS:
+        raise ValueError(f"unknown precision {precision!r}; expected one of {PRECISIONS}")
+    return np.longdouble if precision == "longdouble" else np.float64
+
+
+def run_recurrence(b: np.ndarray,
+                   lam: float,
+                   rho: float,
+                   M0: float = 0.0,
+                   mode: str = "auto",
+                   kernel="exp",
+                   kappa: float = 1.0,
+                   precision: str = "float64") -> Tuple[np.ndarray, np.ndarray]:
+    """Advance M_{n+1} = M_n + b_n * f(M_n); return (a, M).
+
+    f is a memory kernel from kernels.py (name, MemoryKernel or callable),
+    by default exp(-lam * M^rho). precision is one of PRECISIONS; with
+    "longdouble" mode is ignored, and b should already be np.longdouble.
+    """
+    kern = get_kernel(kernel)
+    if baseline_dtype(precision) is np.longdouble:
+        b = np.ascontiguousarray(b, dtype=np.longdouble)
+        a, M, _ = _reference_recurrence(b, lam, rho, np.longdouble(M0), kern.f, kappa)
+        return a, M
+    b = np.ascontiguousarray(b, dtype=float)
+    mode = resolve_mode(mode, kern)
+    compensated = precision == "float32"
+    if mode == "numba":
+        a = np.empty(b.shape, dtype=np.float32 if compensated else float)
+        M = np.empty_like(b)
+        _compiled_loops()[0](b, kern.kind, float(lam), float(rho), float(kappa), float(M0), a, M, compensated)
+        return a, M
+    if mode == "numpy":
+        a, M, _ = _numpy_recurrence(b, lam, rho, M0, kern.f, kappa)
+    else:
+        a, M, _ = _reference_recurrence(b, lam, rho, M0, kern.f, kappa)
+    if compensated:
+        return a.astype(np.float32), _compensate(float(M0), a, M)
+    return a, M
+
+
+def run_recurrence_batch(b: np.ndarray,
+                         lam,
+                         rho,
+                         M0=0.0,
+                         mode: str = "auto",
+                         kernel="exp",
+                         kappa=1.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Advance K configurations in lockstep; b is (K, L), lam/rho/M0/kappa broadcast to K.
+
+    kernel is one memory kernel or a sequence of K, so families can share a batch.
+    """
+    b = np.ascontiguousarray(np.atleast_2d(b), dtype=float)
+    K = b.shape[0]
+    lam = np.ascontiguousarray(np.broadcast_to(np.asarray(lam, dtype=float), (K,)))
+    rho = np.ascontiguousarray(np.broadcast_to(np.asarray(rho, dtype=float), (K,)))
+    M0 = np.ascontiguousarray(np.broadcast_to(np.asarray(M0, dtype=float), (K,)))
+    kappa = np.ascontiguousarray(np.broadcast_to(np.asarray(kappa, dtype=float), (K,)))
+    if isinstance(kernel, (list, tuple, np.ndarray)):
+        if len(kernel) != K:
+            raise ValueError(f"got {len(kernel)} kernels for {K} configurations")
+        kernels = [get_kernel(k) for k in kernel]
+    else:
+        kernels = [get_kernel(kernel)] * K
+    user = next((k for k in kernels if k.kind == USER), None)
+    mode = resolve_mode(mode, user)
+    if mode == "numba":
+        a = np.empty_like(b)
+        M = np.empty_like(b)
+        kind = np.array([k.kind for k in kernels], dtype=np.int64)
+        _compiled_loops()[1](b, kind, lam, rho, kappa, M0, a, M)
+        return a, M
+    if mode == "numpy":
+        return _numpy_recurrence_batch(b, lam, rho, M0, kernels, kappa)
+    return _reference_recurrence_batch(b, lam, rho, M0, kernels, kappa)
+
+
+def stream_recurrence(baseline: Callable[[np.ndarray], np.ndarray],
+                      N: int,
+                      lam: float,
+                      rho: float,
+                      block: int = DEFAULT_BLOCK,
+                      M0: float = 0.0,
+                      mode: str = "auto",
+                      kernel="exp",
+                      kappa: float = 1.0,
+                      precision: str = "float64") -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Yield (n, a, M) blocks of at most `block` terms over n = 2 .. N+1.
+
+    Only the accumulator is carried between blocks, so memory is O(block).
+    """
+    accum = M0
+    for start in range(0, N, block):
+        stop = min(N, start + block)
+        n = np.arange(start + 2, stop + 2, dtype=float)
+        a, M = run_recurrence(baseline(n), lam, rho, M0=accum, mode=mode, kernel=kernel, kappa=kappa,
+                              precision=precision)
+        # M[-1] itself, so a longdouble accumulator keeps its extra digits
+        accum = M[-1]
+        yield n, a, M
@@ -0,0 +1,154 @@
+import csv
+import glob
+import os
+import shutil
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+
+# Columnar sweep results: one .npz of column arrays plus the names of the
+# index columns (the parameter axes). Appends go to numbered part files in
+# <path>.parts/ so each costs O(rows appended); compact() folds them into the
+# main file. Reads concatenate everything, keep the last row per index key
+# and sort by the index, so repeated or resumed sweeps never duplicate points.
+Table = Dict[str, np.ndarray]
+INDEX = "__index__"
+
+
+def store_path(csv_path: str) -> str:
+    """The store that sits next to a sweep CSV."""
+    return os.path.splitext(csv_path)[0] + ".npz"
+
+
+def _columns(rows: List[dict]) -> Table:
+    out = {}
+    for k in rows[0].keys():
+        values = [row[k] for row in rows]
+        try:
+            out[k] = np.asarray(values, dtype=float if any(isinstance(v, float) for v in values) else None)
+        except (TypeError, ValueError):
+            out[k] = np.asarray([str(v) for v in values])
+        if out[k].dtype == object:
+            out[k] = out[k].astype(str)
+    return out
+
+
+def _save(path: str, table: Table, index: Sequence[str]):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **table, **{INDEX: np.asarray(list(index), dtype=str)})
+    os.replace(tmp, path)
+
+
+def _read(path: str) -> tuple:
+    with np.load(path) as z:
+        return {k: z[k] for k in z.files if k != INDEX}, list(z[INDEX])
+
+
+def _dedupe(table: Table, index: Sequence[str]) -> Table:
+    if not index or not table:
+        return table
+    # Stable sort by the index (last column is the primary key for lexsort);
+    # within equal keys the latest append is last, and that one is kept
+    order = np.lexsort([table[c] for c in reversed(index)])
+    keys = [table[c][order] for c in index]
+    last = np.ones(len(order), dtype=bool)
+    if len(order) > 1:
+        same = np.ones(len(order) - 1, dtype=bool)
+        for k in keys:
+            same &= k[1:] == k[:-1]
+        last[:-1] = ~same
+    keep = order[last]
+    return {k: v[keep] for k, v in table.items()}
+
+
+class ResultStore:
+    def __init__(self, path: str, index: Optional[Sequence[str]] = None):
+        self.path = path
+        self.parts = path + ".parts"
+        self.index = list(index) if index is not None else None
+
+    def _part_files(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.parts, "part-*.npz")))
+
+    def append(self, rows: List[dict]):
+        """Add result rows (dicts sharing their keys); the index defaults to none."""
+        if not rows:
+            return
+        files = self._part_files()
+        n = int(os.path.basename(files[-1])[5:-4]) + 1 if files else 0
+        os.makedirs(self.parts, exist_ok=True)
+        _save(os.path.join(self.parts, f"part-{n:06d}.npz"), _columns(rows), self.index or [])
+
+    def load(self, columns: Optional[Sequence[str]] = None, **where) -> Table:
+        """Columns of the rows matching every column == value in where (all columns by default)."""
+        tables = []
+        index = self.index
+        for p in ([self.path] if os.path.exists(self.path) else []) + self._part_files():
+            table, idx = _read(p)
+            tables.append(table)
+            index = index or idx
+        if not tables:
+            raise FileNotFoundError(f"no results stored at {self.path}")
+        names = list(tables[0].keys())
+        if len(tables) == 1 and os.path.exists(self.path):
+            table = tables[0]  # compacted: already unique and sorted
+        else:
+            table = _dedupe({k: np.concatenate([t[k] for t in tables]) for k in names}, index or [])
+        if where:
+            mask = np.ones(len(table[names[0]]), dtype=bool)
+            for k, v in where.items():
+                col = table[k]
+                mask &= np.isclose(col, v, rtol=1e-12, atol=0.0) if col.dtype.kind == "f" else col == v
+            table = {k: v[mask] for k, v in table.items()}
+        return {k: table[k] for k in (columns or names)}
+
+    def compact(self):
+        """Fold the appended parts into the main file."""
+        files = self._part_files()
+        if not files:
+            return
+        table = self.load()
+        _, idx = _read(files[0])
+        _save(self.path, table, self.index or idx)
+        shutil.rmtree(self.parts, ignore_errors=True)
+
+    def clear(self):
+        shutil.rmtree(self.parts, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def load_table(path: str, columns: Optional[Sequence[str]] = None, **where) -> Table:
+    """A ResultStore (.npz) or a sweep CSV as columns, with the same where filter."""
+    if path.endswith(".npz"):
+        return ResultStore(path).load(columns, **where)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    header, body = rows[0], rows[1:]
+    table = {}
+    for j, name in enumerate(header):
+        col = [r[j] for r in body]
+        try:
+            table[name] = np.asarray(col, dtype=float)
+        except ValueError:
+            table[name] = np.asarray(col)
+    if where:
+        mask = np.ones(len(body), dtype=bool)
+        for k, v in where.items():
+            col = table[k]
+            mask &= np.isclose(col, v, rtol=1e-12, atol=0.0) if col.dtype.kind == "f" else col == str(v)
+        table = {k: v[mask] for k, v in table.items()}
+    return {k: table[k] for k in (columns or header)}
+
+
+def pivot(table, row: str, col: str, value: str) -> tuple:
+    """(row values, column values, grid) with grid[i, j] the value at (rows[i], cols[j]), NaN where missing.
+
+    Where several rows share a cell, the first one wins.
+    """
+    r_vals, ri = np.unique(np.asarray(table[row], dtype=float), return_inverse=True)
+    c_vals, ci = np.unique(np.asarray(table[col], dtype=float), return_inverse=True)
+    grid = np.full((len(r_vals), len(c_vals)), np.nan)
+    grid[ri[::-1], ci[::-1]] = np.asarray(table[value], dtype=float)[::-1]
+    return r_vals, c_vals, grid
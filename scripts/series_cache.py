@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+from typing import Callable, Dict, Optional
+
+from . import grid_tables, kernels, recurrence
+from .artifacts import HEADER, ArtifactWriter, has_artifact, open_artifact, source_version
+
+
+CACHE_DIR = os.environ.get("SERIES_CACHE_DIR", os.path.join(".cache", "series"))
+MAX_BYTES = int(float(os.environ.get("SERIES_CACHE_MAX_BYTES", 2e9)))
+MAX_AGE = float(os.environ["SERIES_CACHE_MAX_AGE"]) if "SERIES_CACHE_MAX_AGE" in os.environ else None
+
+# compute(start, stop, M0) -> {"M": ..., other columns...} for terms start..stop-1
+Segment = Callable[[int, int, float], Dict[str, np.ndarray]]
+
+
+def cache_key(kernel: str, params: dict, dtype: str, version: str) -> str:
+    blob = json.dumps({"kernel": kernel, "params": params, "dtype": dtype, "version": version},
+                      sort_keys=True, default=float)
+    return hashlib.sha1(blob.encode()).hexdigest()
+
+
+def _entry_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def evict(cache_dir: str = None,
+          max_bytes: Optional[int] = None,
+          max_age: Optional[float] = None,
+          keep: Optional[str] = None):
+    """Drop entries idle for more than max_age seconds, then least recently used ones down to max_bytes."""
+    cache_dir = cache_dir or CACHE_DIR
+    if not os.path.isdir(cache_dir):
+        return
+    entries = []
+    now = time.time()
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if path == keep or not has_artifact(path):
+            continue
+        last = os.path.getmtime(os.path.join(path, HEADER))
+        if max_age is not None and now - last > max_age:
+            shutil.rmtree(path, ignore_errors=True)
+            continue
+        entries.append((last, _entry_bytes(path), path))
+    if max_bytes is None:
+        return
+    total = sum(size for _, size, _ in entries)
+    for last, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+def cached_series(kernel: str,
+                  params: dict,
+                  N: int,
+                  compute: Segment,
+                  dtype: str = "float64",
+                  cache_dir: str = None,
+                  block: int = recurrence.DEFAULT_BLOCK) -> Dict[str, np.ndarray]:
+    """Length-N columns of a prefix-computable series, served from the cache.
+
+    Entries are artifacts (see artifacts.py) keyed on (kernel, params, dtype,
+    source of compute's module, the recurrence engine, the index tables and
+    the memory kernels). A cached run at least N long is sliced; a shorter
+    one is extended from its final accumulator M[-1], and only the missing
+    terms are computed. New terms are
+    produced `block` at a time straight into the memory-mapped columns, and
+    the returned columns are read-only memory maps.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    version = source_version(compute, recurrence, grid_tables, kernels)
+    key = cache_key(kernel, params, dtype, version)
+    path = os.path.join(cache_dir, key)
+    start, M0, old = 0, 0.0, None
+    if has_artifact(path):
+        header, old = open_artifact(path)
+        if header["length"] >= N:
+            os.utime(os.path.join(path, HEADER))
+            return {name: col[:N] for name, col in old.items()}
+        start, M0 = header["length"], old["M"][-1]
+    elif N <= 0:
+        # Nothing to store: the zero-length columns, straight from compute
+        return compute(0, 0, M0)
+    os.makedirs(cache_dir, exist_ok=True)
+    writer = None
+    for lo in range(start, N, block):
+        hi = min(N, lo + block)
+        seg = compute(lo, hi, M0)
+        if writer is None:
+            meta = {"kernel": kernel, "params": params, "dtype": dtype, "version": version}
+            writer = ArtifactWriter(path, N, {name: col.dtype for name, col in seg.items()}, meta)
+            for name, col in (old or {}).items():
+                for i in range(0, start, block):
+                    writer.write(i, {name: col[i:min(start, i + block)]})
+        writer.write(lo, seg)
+        M0 = seg["M"][-1]
+    writer.commit()
+    evict(cache_dir, max_bytes=MAX_BYTES, max_age=MAX_AGE, keep=path)
+    return open_artifact(path)[1]
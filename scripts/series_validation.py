@@ -1,90 +1,356 @@
+import os
+from functools import partial
 import numpy as np
-from typing import Tuple, Callable
+from typing import Tuple, Iterator
 
-
-def baseline_term(n: np.ndarray, alpha: float, beta: float) -> np.ndarray:
-    ln_n = np.log(n)
-    ln_n = np.where(ln_n == 0.0, np.finfo(float).tiny, ln_n)
-    return 1.0 / (np.power(n, alpha) * np.power(ln_n, beta))
-
-
-def f_memory(M: np.ndarray, lam: float, rho: float) -> np.ndarray:
-    return np.exp(-lam * np.power(M, rho))
+from .acceleration import PartialSums, extrapolate, geometric_sizes
+from .continuum import hybrid_accumulate
+from .grid_tables import baseline_term
+from .instrument import stage
+from .kernels import EXP, get_kernel
+from .recurrence import DEFAULT_BLOCK, baseline_dtype, run_recurrence, run_recurrence_batch, stream_recurrence
+from .sweep_executor import run_sweep
+from .tangents import PARAMS, stream_tangents, tangent_block
 
 
 def memory_weighted_series(N: int,
                            alpha: float,
                            beta: float,
                            lam: float,
-                           rho: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+                           rho: float,
+                           mode: str = "auto",
+                           kernel="exp",
+                           kappa: float = 1.0,
+                           tangents: bool = False,
+                           precision: str = "float64") -> tuple:
+    """(n, a, M); with tangents also {"a": da, "M": dM}, rows ordered as tangents.PARAMS.
+
+    precision is a recurrence.PRECISIONS entry ("float32" stores a as float32).
+    """
     n = np.arange(2, N + 2, dtype=float)  # start at 2 for ln n
-    b = baseline_term(n, alpha, beta)
-    a = np.empty_like(b)
-    M = np.empty_like(b)
-    accum = 0.0
-    for i in range(N):
-        m_val = accum
-        fm = f_memory(np.array([m_val]), lam, rho)[0]
-        ai = b[i] * fm
-        a[i] = ai
-        accum += ai
-        M[i] = accum
+    b = baseline_term(n, alpha, beta, baseline_dtype(precision))
+    a, M = run_recurrence(b, lam, rho, mode=mode, kernel=kernel, kappa=kappa, precision=precision)
+    if tangents:
+        da, dM = tangent_block(n, a, M, 0.0, 0.0, lam, rho, kernel, kappa)
+        return n, a, M, {"a": da, "M": dM}
     return n, a, M
 
 
-def windowed_growth(M: np.ndarray, window: int = 10000) -> float:
-    if len(M) < 2 * window:
-        window = max(10, len(M) // 10)
-    start = len(M) - 2 * window
-    end = len(M)
+def memory_weighted_blocks(N: int,
+                           alpha: float,
+                           beta: float,
+                           lam: float,
+                           rho: float,
+                           block: int = DEFAULT_BLOCK,
+                           mode: str = "auto",
+                           kernel="exp",
+                           kappa: float = 1.0,
+                           precision: str = "float64") -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """memory_weighted_series() as a generator of (n, a, M) blocks."""
+    dtype = baseline_dtype(precision)
+    return stream_recurrence(lambda n: baseline_term(n, alpha, beta, dtype, share=False), N, lam, rho,
+                             block=block, mode=mode, kernel=kernel, kappa=kappa, precision=precision)
+
+
+def _growth_span(length: int, window: int = 10000) -> Tuple[int, int]:
+    if length < 2 * window:
+        window = max(10, length // 10)
+    start = length - 2 * window
+    end = length
     if start < 0:
         start = 0
+    return start, end
+
+
+def _tail_span(length: int, window: int = 10000) -> int:
+    if length < window:
+        window = max(10, length // 5)
+    return max(0, length - window)
+
+
+def windowed_growth(M: np.ndarray, window: int = 10000) -> float:
+    start, end = _growth_span(len(M), window)
     delta = M[end - 1] - M[start]
     return delta / max(1, (end - start))
 
 
 def tail_mean(a: np.ndarray, window: int = 10000) -> float:
-    if len(a) < window:
-        window = max(10, len(a) // 5)
-    return float(np.mean(a[-window:]))
+    return float(np.mean(a[_tail_span(len(a), window):]))
+
+
+class OnlineMetrics:
+    """Final sum, windowed_growth and tail_mean reduced over consecutive blocks.
+
+    Blocks must arrive in order; a and M may carry leading batch axes.
+    """
+
+    def __init__(self, N: int, shape: tuple = (), window: int = 10000):
+        self.N = N
+        self.g_start, self.g_end = _growth_span(N, window)
+        self.t_start = _tail_span(N, window)
+        self.offset = 0
+        self.total = np.zeros(shape)
+        self.M_g = np.zeros(shape)
+        self.tail_sum = np.zeros(shape)
+
+    def update(self, a: np.ndarray, M: np.ndarray):
+        start = self.offset
+        stop = start + a.shape[-1]
+        if start <= self.g_start < stop:
+            self.M_g = M[..., self.g_start - start].copy()
+        if stop > self.t_start:
+            self.tail_sum = self.tail_sum + a[..., max(self.t_start, start) - start:].sum(axis=-1)
+        self.total = M[..., -1].copy()
+        self.offset = stop
+
+    def windowed_growth(self):
+        return (self.total - self.M_g) / max(1, self.g_end - self.g_start)
+
+    def tail_mean(self):
+        return self.tail_sum / (self.N - self.t_start)
+
+
+def _theoretical_class(alpha: float, beta: float) -> str:
+    return "convergent" if (alpha > 1.0 or (abs(alpha - 1.0) < 1e-12 and beta > 1.0)) else "divergent"
 
 
 def classify(N: int,
              alpha: float,
              beta: float,
              lam: float,
-             rho: float) -> dict:
-    n, a, M = memory_weighted_series(N, alpha, beta, lam, rho)
-    wg = windowed_growth(M)
-    tm = tail_mean(a)
-    theoretical = (
-        "convergent" if (alpha > 1.0 or (abs(alpha - 1.0) < 1e-12 and beta > 1.0)) else "divergent"
-    )
+             rho: float,
+             mode: str = "auto",
+             block: int = DEFAULT_BLOCK,
+             n0: int | None = None,
+             window: int = 10000,
+             kernel="exp",
+             kappa: float = 1.0,
+             tangents: bool = False,
+             limit: str | None = None,
+             precision: str = "float64") -> dict:
+    """Final sum, windowed_growth and tail_mean of one series.
+
+    With tangents the row also carries their derivatives with respect to
+    alpha, beta, lam and rho ("dsum_dalpha", "dtail_mean_drho", ...), from
+    the same pass. limit names an acceleration.METHODS entry: the partial
+    sums at N, N/2, N/4, ... are extrapolated to the infinite sum (limit,
+    limit_err, and the bracket limit_lo, limit_hi). precision is a
+    recurrence.PRECISIONS entry for the streamed pass. n0 sums only the
+    first n0 terms exactly and carries the rest on the continuum tail; it
+    must not reach into the growth window.
+    """
+    g_start, g_end = _growth_span(N, window)
+    t_start = _tail_span(N, window)
+    if n0 is not None and n0 > g_start:
+        raise ValueError(f"n0 = {n0} must not exceed the growth window start {g_start} (N = {N}, window = {window})")
+    hybrid = n0 is not None
+    if hybrid and get_kernel(kernel).kind != EXP:
+        raise ValueError("the continuum tail (n0) is only available for the 'exp' memory kernel")
+    if hybrid and (tangents or limit):
+        raise ValueError("tangents and limit are not available with the continuum tail (n0)")
+    if hybrid:
+        # Exact up to n0, continuum tail to N (see continuum.hybrid_accumulate)
+        res = hybrid_accumulate(N, alpha, beta, lam, rho, n0,
+                                at=[g_start, t_start - 1, N - 1], mode=mode)
+        total = res["values"][-1]
+        _, inc_gt, inc_tN = res["increments"]
+        wg = (inc_gt + inc_tN) / max(1, g_end - g_start)
+        tm = inc_tN / (N - t_start)
+    else:
+        # Streamed in blocks: memory stays O(block) however large N is
+        metrics = OnlineMetrics(N, window=window)
+        d_metrics = OnlineMetrics(N, (len(PARAMS),), window)
+        sums = PartialSums(geometric_sizes(N))
+        with stage("classify", terms=N):
+            blocks = memory_weighted_blocks(N, alpha, beta, lam, rho, block=block, mode=mode,
+                                            kernel=kernel, kappa=kappa, precision=precision)
+            if tangents:
+                for n, a, M, da, dM in stream_tangents(blocks, lam, rho, kernel, kappa):
+                    with stage("metrics"):
+                        metrics.update(a, M)
+                        d_metrics.update(da, dM)
+                        sums.update(a, M)
+            else:
+                for n, a, M in blocks:
+                    with stage("metrics"):
+                        metrics.update(a, M)
+                        sums.update(a, M)
+        total, wg, tm = metrics.total, metrics.windowed_growth(), metrics.tail_mean()
+    theoretical = _theoretical_class(alpha, beta)
     result = {
         "N": N,
         "alpha": alpha,
         "beta": beta,
         "lam": lam,
         "rho": rho,
-        "sum": float(M[-1]),
+        "sum": float(total),
         "windowed_growth": float(wg),
         "tail_mean": float(tm),
         "classification": theoretical,
     }
+    if hybrid:
+        result["n0"] = n0
+        result["error_estimate"] = res["error_estimate"]
+    if tangents:
+        result.update(_tangent_columns(d_metrics))
+    if limit:
+        result.update(extrapolate(sums.sizes, sums.values, alpha, beta, lam, rho, limit, kernel, kappa))
     return result
 
 
-if __name__ == "__main__":
-    configs = [
-        (0.9, 0.0), (1.0, 0.0), (1.0, 1.0), (1.1, 0.0), (1.0, 1.5)
-    ]
-    lam_vals = [0.0, 1e-4, 1e-3]
-    rho_vals = [0.5, 1.0, 2.0]
-    N = 800000
-    for (alpha, beta) in configs:
-        for lam in lam_vals:
-            for rho in rho_vals:
-                res = classify(N, alpha, beta, lam, rho)
-                print(res)
+def _tangent_columns(d_metrics: OnlineMetrics, k=()) -> dict:
+    values = {"sum": d_metrics.total, "windowed_growth": d_metrics.windowed_growth(),
+              "tail_mean": d_metrics.tail_mean()}
+    return {f"d{name}_d{p}": float(v[(i,) + k]) for name, v in values.items() for i, p in enumerate(PARAMS)}
+
+
+def classify_batch(N: int,
+                   alpha,
+                   beta,
+                   lam,
+                   rho,
+                   mode: str = "auto",
+                   block: int = 8192,
+                   window: int = 10000,
+                   kernel="exp",
+                   kappa=1.0,
+                   tangents: bool = False,
+                   limit: str | None = None) -> list:
+    """classify() for broadcast parameter arrays, advanced in lockstep over n.
+
+    Metrics are reduced block by block, so only a (K, block) slab is alive.
+    kernel may be a list with one memory kernel per configuration (all the
+    same with tangents).
+    """
+    alpha, beta, lam, rho, kappa = (np.ravel(x).astype(float)
+                                    for x in np.broadcast_arrays(alpha, beta, lam, rho, kappa))
+    K = len(alpha)
+    if tangents and isinstance(kernel, (list, tuple, np.ndarray)):
+        if len({get_kernel(k) for k in kernel}) > 1:
+            raise ValueError("tangents need one memory kernel for the whole batch")
+        kernel = kernel[0]
+    metrics = OnlineMetrics(N, (K,), window)
+    d_metrics = OnlineMetrics(N, (len(PARAMS), K), window)
+    accum = np.zeros(K)
+    d_accum = np.zeros((len(PARAMS), K))
+    sums = PartialSums(geometric_sizes(N), (K,))
+    for start in range(0, N, block):
+        stop = min(N, start + block)
+        n = np.arange(start + 2, stop + 2, dtype=float)
+        with stage("series", terms=K * (stop - start)):
+            b = baseline_term(n[None, :], alpha[:, None], beta[:, None], share=False)
+            a, M = run_recurrence_batch(b, lam, rho, M0=accum, mode=mode, kernel=kernel, kappa=kappa)
+        with stage("metrics"):
+            if tangents:
+                da, dM = tangent_block(n, a, M, accum, d_accum, lam, rho, kernel, kappa, share=False)
+                d_metrics.update(da, dM)
+                d_accum = d_metrics.total
+            metrics.update(a, M)
+            sums.update(a, M)
+        accum = metrics.total
+    wg = metrics.windowed_growth()
+    tm = metrics.tail_mean()
+    rows = [{
+        "N": N,
+        "alpha": float(alpha[k]),
+        "beta": float(beta[k]),
+        "lam": float(lam[k]),
+        "rho": float(rho[k]),
+        "sum": float(accum[k]),
+        "windowed_growth": float(wg[k]),
+        "tail_mean": float(tm[k]),
+        "classification": _theoretical_class(alpha[k], beta[k]),
+    } for k in range(K)]
+    if tangents:
+        for k, row in enumerate(rows):
+            row.update(_tangent_columns(d_metrics, (k,)))
+    if limit:
+        kernels = kernel if isinstance(kernel, (list, tuple, np.ndarray)) else [kernel] * K
+        for k, row in enumerate(rows):
+            row.update(extrapolate(sums.sizes, sums.values[k], alpha[k], beta[k], lam[k], rho[k], limit,
+                                   kernels[k], kappa[k]))
+    return rows
+
 
+def classify_points(points: list, batched: bool = True, mode: str = "auto", window: int = 10000,
+                    tangents: bool = False, limit: str | None = None) -> list:
+    """Chunk function for sweep_executor.run_sweep: one classify() row per point dict.
+
+    Points may name a memory kernel ("kernel", "kappa"); the rows then carry both.
+    """
+    if not batched:
+        rows = [classify(p["N"], p["alpha"], p["beta"], p["lam"], p["rho"], mode=mode, window=window,
+                         kernel=p.get("kernel", "exp"), kappa=p.get("kappa", 1.0), tangents=tangents,
+                         limit=limit)
+                for p in points]
+        return [_with_kernel(row, p) for row, p in zip(rows, points)]
+    rows = [None] * len(points)
+    for N in sorted({p["N"] for p in points}):
+        idx = [i for i, p in enumerate(points) if p["N"] == N]
+        batch = classify_batch(N,
+                               [points[i]["alpha"] for i in idx],
+                               [points[i]["beta"] for i in idx],
+                               [points[i]["lam"] for i in idx],
+                               [points[i]["rho"] for i in idx],
+                               mode=mode,
+                               window=window,
+                               kernel=[points[i].get("kernel", "exp") for i in idx],
+                               kappa=[points[i].get("kappa", 1.0) for i in idx],
+                               tangents=tangents,
+                               limit=limit)
+        for i, row in zip(idx, batch):
+            rows[i] = _with_kernel(row, points[i])
+    return rows
+
+
+def _with_kernel(row: dict, point: dict) -> dict:
+    for key in ("kernel", "kappa"):
+        if key in point:
+            row[key] = point[key]
+    return row
+
+
+def validate_regimes(N: int = 800000,
+                     configs: tuple = ((0.9, 0.0), (1.0, 0.0), (1.0, 1.0), (1.1, 0.0), (1.0, 1.5)),
+                     lam_vals: tuple = (0.0, 1e-4, 1e-3),
+                     rho_vals: tuple = (0.5, 1.0, 2.0),
+                     csv_path: str | None = None,
+                     workers: int = 1,
+                     window: int = 10000,
+                     kernels: tuple | None = None,
+                     limit: str | None = None) -> list:
+    """classify() over every (alpha, beta) config x lam x rho, one row each.
+
+    With limit (an acceleration.METHODS entry, see classify) rows also carry
+    the extrapolated infinite sum, inf for divergent configurations.
+
+    With kernels, a sequence of (name, kappa) memory kernels, every point is
+    repeated per kernel and the rows gain kernel and kappa columns; all
+    kernels of a point share one batched recurrence.
+    """
+    families = [{}] if kernels is None else [{"kernel": k, "kappa": float(kappa)} for k, kappa in kernels]
+    points = [{"N": N, "alpha": float(alpha), "beta": float(beta), "lam": float(lam), "rho": float(rho), **fam}
+              for (alpha, beta) in configs
+              for lam in lam_vals
+              for rho in rho_vals
+              for fam in families]
+    with stage("sweep", terms=N * len(points)):
+        return run_sweep(partial(classify_points, window=window, limit=limit),
+                         points,
+                         csv_path=csv_path,
+                         workers=workers,
+                         chunk_size=len(rho_vals) * len(families),
+                         meta={"window": window, "limit": limit})
+
+
+if __name__ == "__main__":
+    import inspect
+    from .instrument import RunRecorder
 
+    params = {k: p.default for k, p in inspect.signature(validate_regimes).parameters.items()}
+    params["workers"] = os.cpu_count() or 1
+    with RunRecorder("series_validation", params) as rec:
+        rec.terms = params["N"] * len(params["configs"]) * len(params["lam_vals"]) * len(params["rho_vals"])
+        results = validate_regimes(**params)
+    for res in results:
+        print(res)
@@ -0,0 +1,117 @@
+import math
+import numpy as np
+
+
+class LogSketch:
+    """Mergeable quantile sketch of nonnegative values with relative error rel_err.
+
+    Positive values go into logarithmic buckets (gamma^(i-1), gamma^i] with
+    gamma = (1 + rel_err) / (1 - rel_err), the DDSketch layout: every value
+    in a bucket lies within rel_err of its representative 2 gamma^i / (gamma + 1),
+    so quantile(q) is within rel_err of the exact order statistic at rank
+    q * (count - 1). Buckets also keep the sum and sum of squares of their
+    values, for moments over a value window. Memory is O(log(max / min) /
+    rel_err) per stream, independent of how many values were added; merging
+    two sketches adds their buckets. Zeros are counted separately.
+
+    One sketch holds independent streams for every index of `shape`; update()
+    takes arrays of shape + (L,).
+    """
+
+    def __init__(self, shape: tuple = (), rel_err: float = 1e-3):
+        if not 0.0 < rel_err < 1.0:
+            raise ValueError(f"rel_err must lie in (0, 1), got {rel_err}")
+        self.shape = tuple(shape)
+        self.rel_err = rel_err
+        self.gamma = (1.0 + rel_err) / (1.0 - rel_err)
+        self._log_gamma = math.log(self.gamma)
+        K = int(np.prod(self.shape))
+        self.lo = 0  # bucket index of column 0
+        self.counts = np.zeros((K, 0))
+        self.sums = np.zeros((K, 0))
+        self.sumsq = np.zeros((K, 0))
+        self.zeros = np.zeros(K)
+        self.count = np.zeros(K)
+        self.total = np.zeros(K)
+        self.total_sq = np.zeros(K)
+
+    def _grow(self, lo: int, hi: int):
+        # Widen the bucket columns to cover indices lo..hi-1
+        if self.counts.shape[1] == 0:
+            self.lo = lo
+        new_lo = min(lo, self.lo)
+        new_hi = max(hi, self.lo + self.counts.shape[1])
+        if new_lo == self.lo and new_hi == self.lo + self.counts.shape[1]:
+            return
+        pad = ((0, 0), (self.lo - new_lo, new_hi - self.lo - self.counts.shape[1]))
+        self.counts = np.pad(self.counts, pad)
+        self.sums = np.pad(self.sums, pad)
+        self.sumsq = np.pad(self.sumsq, pad)
+        self.lo = new_lo
+
+    def update(self, x: np.ndarray):
+        x = np.asarray(x, dtype=float).reshape(len(self.zeros), -1)
+        if np.any(x < 0):
+            raise ValueError("LogSketch takes nonnegative values")
+        self.count += x.shape[1]
+        self.total += x.sum(axis=1)
+        self.total_sq += np.square(x).sum(axis=1)
+        pos = x > 0
+        self.zeros += x.shape[1] - pos.sum(axis=1)
+        rows = np.broadcast_to(np.arange(len(self.zeros))[:, None], x.shape)[pos]
+        vals = x[pos]
+        if vals.size == 0:
+            return
+        idx = np.ceil(np.log(vals) / self._log_gamma).astype(np.int64)
+        self._grow(int(idx.min()), int(idx.max()) + 1)
+        width = self.counts.shape[1]
+        flat = rows * width + (idx - self.lo)
+        size = self.counts.size
+        self.counts += np.bincount(flat, minlength=size).reshape(self.counts.shape)
+        self.sums += np.bincount(flat, weights=vals, minlength=size).reshape(self.counts.shape)
+        self.sumsq += np.bincount(flat, weights=vals * vals, minlength=size).reshape(self.counts.shape)
+
+    def merge(self, other: "LogSketch") -> "LogSketch":
+        if other.rel_err != self.rel_err or other.shape != self.shape:
+            raise ValueError("can only merge sketches with the same shape and rel_err")
+        if other.counts.shape[1]:
+            self._grow(other.lo, other.lo + other.counts.shape[1])
+            cols = slice(other.lo - self.lo, other.lo - self.lo + other.counts.shape[1])
+            self.counts[:, cols] += other.counts
+            self.sums[:, cols] += other.sums
+            self.sumsq[:, cols] += other.sumsq
+        for name in ("zeros", "count", "total", "total_sq"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+
+    def _value(self, idx) -> np.ndarray:
+        return 2.0 * np.power(self.gamma, self.lo + np.asarray(idx, dtype=float)) / (self.gamma + 1.0)
+
+    def quantile(self, q: float, positive: bool = False) -> np.ndarray:
+        """Estimate of the q-quantile per stream (NaN for empty ones); positive skips the zeros."""
+        zeros = 0.0 if positive else self.zeros
+        n = self.counts.sum(axis=1) + zeros
+        rank = q * (n - 1)
+        cum = np.cumsum(self.counts, axis=1) + np.asarray(zeros)[..., None]
+        col = np.argmax(cum > rank[:, None], axis=1) if cum.shape[1] else np.zeros(len(n), dtype=np.int64)
+        out = np.where(rank < zeros, 0.0, self._value(col)) if cum.shape[1] else np.zeros(len(n))
+        return np.where(n > 0, out, np.nan).reshape(self.shape)
+
+    def window(self, lo, hi):
+        """(count, sum, sum of squares) of the values in the open interval (lo, hi), per stream.
+
+        Buckets straddling an end contribute the fraction of their log range
+        inside the interval, as if their values were log-uniform; the
+        interpolated part is bounded by the counts of those two buckets.
+        """
+        lo = np.ravel(np.broadcast_to(np.asarray(lo, dtype=float), self.shape))
+        hi = np.ravel(np.broadcast_to(np.asarray(hi, dtype=float), self.shape))
+        i = self.lo + np.arange(self.counts.shape[1], dtype=float)
+        with np.errstate(divide="ignore"):
+            u_lo = np.where(lo > 0, np.log(np.maximum(lo, 0)) / self._log_gamma, -np.inf)
+            u_hi = np.where(hi > 0, np.log(np.maximum(hi, 0)) / self._log_gamma, -np.inf)
+        frac = np.clip(np.minimum(i, u_hi[:, None]) - np.maximum(i - 1.0, u_lo[:, None]), 0.0, 1.0)
+        zeros = np.where((lo < 0) & (hi > 0), self.zeros, 0.0)
+        return (((frac * self.counts).sum(axis=1) + zeros).reshape(self.shape),
+                (frac * self.sums).sum(axis=1).reshape(self.shape),
+                (frac * self.sumsq).sum(axis=1).reshape(self.shape))
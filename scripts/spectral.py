@@ -0,0 +1,192 @@
+import numpy as np
+from typing import Iterable, Tuple
+
+from .grid_tables import log_tables
+
+
+# Log-periodic breathing is periodic in ln n (or ln ln n), not in n. These
+# helpers consume a series block by block, resample it onto a uniform grid in
+# that coordinate and reduce it with bounded memory.
+
+
+def _coord(n: np.ndarray, axis: str) -> np.ndarray:
+    ln_n, ln_ln_n = log_tables(n, share=False)
+    if axis == "lnln":
+        return ln_ln_n
+    if axis != "ln":
+        raise ValueError(f"axis must be 'ln' or 'lnln', got {axis!r}")
+    return ln_n
+
+
+class LogGridResampler:
+    """Resample (n, y) blocks onto bins of width du in u = ln n (or ln ln n).
+
+    A bin holding samples gets their mean, which also anti-aliases the dense
+    tail; an empty bin (sparse small n) is linearly interpolated at its centre.
+    push() returns the bins completed so far, flush() the last open one.
+    """
+
+    def __init__(self, du: float, axis: str = "ln"):
+        self.du = du
+        self.axis = axis
+        self.u0 = None
+        self.pending = None  # (bin index, sum, count) of the open bin
+        self.last = None  # last raw (u, y), for interpolating across blocks
+
+    def _centres(self, k: np.ndarray) -> np.ndarray:
+        return self.u0 + (k + 0.5) * self.du
+
+    def push(self, n: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        u = _coord(np.asarray(n, dtype=float), self.axis)
+        y = np.asarray(y)
+        if len(u) == 0:
+            return np.empty(0), np.empty(0, dtype=y.dtype)
+        if self.u0 is None:
+            self.u0 = float(u[0])
+        k = np.floor((u - self.u0) / self.du).astype(np.int64)
+        first = self.pending[0] if self.pending else int(k[0])
+        width = int(k[-1]) - first + 1
+        sums = np.zeros(width, dtype=np.result_type(y.dtype, float))
+        np.add.at(sums, k - first, y)
+        counts = np.bincount(k - first, minlength=width).astype(float)
+        if self.pending:
+            sums[0] += self.pending[1]
+            counts[0] += self.pending[2]
+        # Every bin but the last is complete once this block has been seen
+        done = width - 1
+        vals = sums[:done] / np.maximum(counts[:done], 1.0)
+        empty = counts[:done] == 0
+        if empty.any():
+            xs = u if self.last is None else np.concatenate(([self.last[0]], u))
+            ys = y if self.last is None else np.concatenate(([self.last[1]], y))
+            centres = self._centres(np.arange(first, first + done)[empty])
+            if np.iscomplexobj(ys):
+                vals[empty] = np.interp(centres, xs, ys.real) + 1j * np.interp(centres, xs, ys.imag)
+            else:
+                vals[empty] = np.interp(centres, xs, ys)
+        self.pending = (int(k[-1]), sums[-1], counts[-1])
+        self.last = (float(u[-1]), y[-1])
+        return self._centres(np.arange(first, first + done)), vals
+
+    def flush(self) -> Tuple[np.ndarray, np.ndarray]:
+        if not self.pending or self.pending[2] == 0:
+            return np.empty(0), np.empty(0)
+        k, s, c = self.pending
+        self.pending = None
+        return self._centres(np.array([k])), np.array([s / c])
+
+
+class WelchPSD:
+    """Segment-averaged periodogram (Welch) over a stream of samples.
+
+    Hann window, constant detrend and density scaling as scipy.signal.welch;
+    real input gives a one-sided PSD, complex input a two-sided one with
+    frequencies in ascending order. Memory is O(nperseg).
+    """
+
+    def __init__(self, nperseg: int = 256, noverlap: int = None, fs: float = 1.0):
+        self.nperseg = nperseg
+        self.step = nperseg - (nperseg // 2 if noverlap is None else noverlap)
+        self.fs = fs
+        k = np.arange(nperseg)
+        self.window = 0.5 - 0.5 * np.cos(2.0 * np.pi * k / nperseg)
+        self.buf = np.empty(0)
+        self.acc = None
+        self.nseg = 0
+        self.complex = False
+
+    def push(self, x: np.ndarray):
+        x = np.asarray(x)
+        if np.iscomplexobj(x) and not self.complex:
+            self.complex = True
+            self.buf = self.buf.astype(complex)
+        self.buf = np.concatenate((self.buf, x))
+        while len(self.buf) >= self.nperseg:
+            seg = self.buf[:self.nperseg]
+            seg = (seg - seg.mean()) * self.window
+            spec = np.fft.fft(seg) if self.complex else np.fft.rfft(seg)
+            power = np.abs(spec) ** 2
+            if self.acc is None:
+                self.acc = power
+            elif len(self.acc) != len(power):
+                raise ValueError("cannot mix real and complex samples in one WelchPSD")
+            else:
+                self.acc += power
+            self.nseg += 1
+            self.buf = self.buf[self.step:]
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self.nseg == 0:
+            raise ValueError(f"need at least nperseg={self.nperseg} samples for a Welch estimate")
+        psd = self.acc / (self.nseg * self.fs * np.sum(self.window ** 2))
+        if self.complex:
+            freqs = np.fft.fftfreq(self.nperseg, d=1.0 / self.fs)
+            order = np.argsort(freqs)
+            return freqs[order], psd[order]
+        psd = psd.copy()
+        psd[1:] *= 2.0
+        if self.nperseg % 2 == 0:
+            psd[-1] /= 2.0
+        return np.fft.rfftfreq(self.nperseg, d=1.0 / self.fs), psd
+
+
+class OnlineLinearFit:
+    """Least-squares line y = slope * x + intercept from streamed blocks.
+
+    Blocks are merged through means and centred co-moments (Chan et al.),
+    which stays accurate where raw power sums would cancel.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mx = 0.0
+        self.my = 0.0
+        self.sxx = 0.0
+        self.sxy = 0.0
+
+    def push(self, x: np.ndarray, y: np.ndarray):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        nb = len(x)
+        if nb == 0:
+            return
+        bx, by = x.mean(), y.mean()
+        dx = x - bx
+        total = self.n + nb
+        ex, ey = bx - self.mx, by - self.my
+        self.sxx += float(dx @ dx) + ex * ex * self.n * nb / total
+        self.sxy += float(dx @ (y - by)) + ex * ey * self.n * nb / total
+        self.mx += ex * nb / total
+        self.my += ey * nb / total
+        self.n = total
+
+    @property
+    def slope(self) -> float:
+        return self.sxy / self.sxx
+
+    @property
+    def intercept(self) -> float:
+        return self.my - self.slope * self.mx
+
+
+def log_periodic_psd(blocks: Iterable[Tuple[np.ndarray, np.ndarray]],
+                     du: float = 0.02,
+                     axis: str = "ln",
+                     nperseg: int = 256,
+                     normalize: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """Welch PSD of a_n on a uniform ln n (or ln ln n) grid from (n, a) blocks.
+
+    With normalize, the unit phasor a_n / |a_n| is analysed, so the power-law
+    envelope does not swamp the oscillation. Frequencies are in cycles per
+    unit of ln n (ln ln n).
+    """
+    resampler = LogGridResampler(du, axis)
+    welch = WelchPSD(nperseg=nperseg, fs=1.0 / du)
+    for n, a in blocks:
+        a = np.asarray(a)
+        if normalize:
+            mag = np.abs(a)
+            a = a / np.where(mag > 0, mag, 1.0)
+        welch.push(resampler.push(n, a)[1])
+    welch.push(resampler.flush()[1])
+    return welch.result()
@@ -0,0 +1,177 @@
+import csv
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing as mp
+from typing import Callable, Iterable, List, Optional, Sequence
+
+from . import instrument
+
+
+def _parse(value: str):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _key(row: dict, key_cols: Sequence[str]) -> tuple:
+    # Compare through str() so a parsed journal row matches the point it came from
+    return tuple(str(_parse(str(row[c]))) for c in key_cols)
+
+
+def journal_path(csv_path: str, meta: Optional[dict] = None) -> str:
+    tag = hashlib.sha1(json.dumps(meta or {}, sort_keys=True, default=str).encode()).hexdigest()[:10]
+    return f"{csv_path}.{tag}.partial"
+
+
+def _read_journal(path: str) -> List[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        text = f.read()
+    # A crash can leave a half-written last line; drop anything after the last newline
+    text = text[:text.rfind("\n") + 1]
+    rows = []
+    for row in csv.DictReader(text.splitlines()):
+        if None in row.values() or None in row:
+            continue
+        rows.append({k: _parse(v) for k, v in row.items()})
+    return rows
+
+
+def _append_rows(path: str, rows: List[dict], fieldnames: List[str]):
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_csv(path: str, rows: List[dict]):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()) if rows else [])
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp, path)
+
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def run_sweep(func: Callable[[List[dict]], List[dict]],
+              points: List[dict],
+              csv_path: Optional[str] = None,
+              workers: int = 1,
+              chunk_size: int = 8,
+              key_cols: Optional[Sequence[str]] = None,
+              meta: Optional[dict] = None,
+              queue_dir: Optional[str] = None,
+              lease_s: float = 60.0,
+              store_path: Optional[str] = None) -> List[dict]:
+    """Evaluate func over chunks of points, optionally in a process pool.
+
+    func maps a list of point dicts to one row dict per point, and each row
+    must carry the point's key_cols. With csv_path, finished chunks are
+    appended to a journal next to the CSV as they complete; a rerun with the
+    same meta skips points already in it. The final CSV is written in point
+    order, independent of the worker count, and the journal is removed.
+
+    With queue_dir, the chunks go through a work_queue directory instead:
+    this process and `workers` local workers join any workers started on
+    other hosts with `python -m scripts.work_queue worker queue_dir`, and the
+    rows are merged once every chunk is done. Rerunning resumes the queue.
+
+    With store_path, rows are also appended to a result_store.ResultStore
+    indexed by key_cols as chunks finish, and compacted at the end.
+    """
+    points = [dict(p) for p in points]
+    key_cols = list(key_cols or (points[0].keys() if points else []))
+    store = None
+    if store_path:
+        from .result_store import ResultStore
+
+        store = ResultStore(store_path, key_cols)
+    if queue_dir:
+        from . import work_queue
+
+        work_queue.submit(queue_dir, func, points, chunk_size, csv_path, meta)
+        if workers > 1:
+            ctx = mp.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                for fut in [pool.submit(work_queue.work, queue_dir, None, lease_s) for _ in range(workers)]:
+                    fut.result()
+        else:
+            work_queue.work(queue_dir, lease_s=lease_s)
+        with instrument.stage("csv_write"):
+            rows = work_queue.merge(queue_dir, csv_path)
+            if store:
+                store.clear()
+                store.append(rows)
+                store.compact()
+        return rows
+    journal = journal_path(csv_path, meta) if csv_path else None
+    if store and not (journal and os.path.exists(journal)):
+        # A fresh sweep replaces what the store held; a resumed one keeps its rows
+        store.clear()
+    done = {}
+    if journal:
+        os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
+        for row in _read_journal(journal):
+            done[_key(row, key_cols)] = row
+    todo = [p for p in points if _key(p, key_cols) not in done]
+    fieldnames = None
+    if journal and os.path.exists(journal) and done:
+        fieldnames = list(next(iter(done.values())).keys())
+
+    def record(rows: List[dict]):
+        nonlocal fieldnames
+        for row in rows:
+            done[_key(row, key_cols)] = row
+        if journal and rows:
+            if fieldnames is None:
+                fieldnames = list(rows[0].keys())
+            _append_rows(journal, rows, fieldnames)
+        if store:
+            store.append(rows)
+
+    chunks = list(_chunks(todo, max(1, chunk_size)))
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            record(func(chunk))
+    else:
+        ctx = mp.get_context("spawn")
+        recorder = instrument.active()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            if recorder is None:
+                futures = [pool.submit(func, chunk) for chunk in chunks]
+            else:
+                # Workers send their stage timings back along with the rows
+                futures = [pool.submit(instrument.collect, func, chunk) for chunk in chunks]
+            for fut in as_completed(futures):
+                if recorder is None:
+                    record(fut.result())
+                else:
+                    rows, stages = fut.result()
+                    recorder.merge(stages)
+                    record(rows)
+
+    results = [done[_key(p, key_cols)] for p in points]
+    if csv_path:
+        with instrument.stage("csv_write"):
+            write_csv(csv_path, results)
+        if os.path.exists(journal):
+            os.remove(journal)
+    if store:
+        store.compact()
+    return results
@@ -0,0 +1,100 @@
+import numpy as np
+from typing import Iterable, Iterator, Tuple
+
+from .grid_tables import log_tables
+from .kernels import EXP, LOGISTIC, RATIONAL, get_kernel
+
+
+# Forward-mode sensitivities of M_{n+1} = M_n + b_n f(M_n) with respect to
+# PARAMS. Differentiating a step gives the linear recurrence
+#   dM_{n+1} = A_n dM_n + B_n,   A_n = 1 + b_n df/dM,   B_n = db_n f + b_n df/dtheta,
+# and with a_n = b_n f(M_n) every coefficient follows from a_n, M_n and n:
+#   db_n/dalpha = -ln n b_n, db_n/dbeta = -ln ln n b_n, and f's derivatives
+#   come from d ln f / dP and d ln f / dlam at P = M^rho.
+# So the tangents of a computed block need no extra pass of the recurrence:
+# the affine maps are composed along n by a prefix scan, which is exact in
+# the same sense as the forward sweep, without its per-step Python loop.
+PARAMS = ("alpha", "beta", "lam", "rho")
+
+
+def _log_derivs(kind: int, P: np.ndarray, lam: np.ndarray, kappa: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # (d ln f / dP, d ln f / dlam) of the built-in kernels
+    if kind == EXP:
+        return -lam * np.ones_like(P), -P
+    if kind == RATIONAL:
+        q = 1.0 + lam * P
+        return -kappa * lam / q, -kappa * P / q
+    if kind == LOGISTIC:
+        with np.errstate(over="ignore"):
+            s = 1.0 / (1.0 + np.exp(-lam * (P - kappa)))
+        e = np.exp(-lam * kappa)
+        return -lam * s, -kappa * e / (1.0 + e) - (P - kappa) * s
+    raise ValueError("tangents need a built-in memory kernel (exp, rational or logistic)")
+
+
+def _affine_scan(A: np.ndarray, B: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Prefix compositions of x -> A_i x + B_i along the last axis by recursive
+    # doubling: afterwards x_{i+1} = A_i x_0 + B_i. B may carry extra leading axes.
+    A = A.copy()
+    B = B.copy()
+    s = 1
+    while s < A.shape[-1]:
+        B[..., s:] = A[..., s:] * B[..., :-s] + B[..., s:]
+        A[..., s:] = A[..., s:] * A[..., :-s]
+        s *= 2
+    return A, B
+
+
+def tangent_block(n: np.ndarray,
+                  a: np.ndarray,
+                  M: np.ndarray,
+                  M0,
+                  dM0,
+                  lam,
+                  rho,
+                  kernel="exp",
+                  kappa=1.0,
+                  share: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """Tangents (da, dM), each (len(PARAMS), ..., L), of a block of terms a and sums M.
+
+    The block follows accumulator M0 (shape ...) whose tangent is dM0
+    (len(PARAMS), ...); a and M may carry leading batch axes, with lam, rho
+    and kappa broadcast over them.
+    """
+    kind = get_kernel(kernel).kind
+    a = np.asarray(a, dtype=float)
+    M = np.asarray(M, dtype=float)
+    lam, rho, kappa = (np.asarray(x, dtype=float)[..., None] for x in (lam, rho, kappa))
+    M0 = np.asarray(M0, dtype=float)
+    dM0 = np.broadcast_to(np.asarray(dM0, dtype=float), (len(PARAMS),) + M0.shape)[..., None]
+    M_prev = np.concatenate((np.broadcast_to(M0[..., None], M.shape[:-1] + (1,)), M[..., :-1]), axis=-1)
+    ln_n, ln_ln_n = log_tables(np.asarray(n, dtype=float), share)
+    pos = M_prev > 0
+    ln_M = np.log(np.where(pos, M_prev, 1.0))
+    P = np.power(M_prev, rho)
+    r_P, r_lam = _log_derivs(kind, P, lam, kappa)
+    # dP/dM = rho M^(rho - 1); at M = 0 only the first term sees it, where dM = 0
+    dP_dM = np.where(pos, rho * P / np.where(pos, M_prev, 1.0), np.where(rho == 1.0, 1.0, 0.0))
+    slope = a * r_P * dP_dM
+    B = np.stack(np.broadcast_arrays(-ln_n * a, -ln_ln_n * a, a * r_lam, np.where(pos, a * r_P * P * ln_M, 0.0)))
+    A_c, B_c = _affine_scan(1.0 + slope, B)
+    dM = A_c * dM0 + B_c
+    # da_n = dM_{n+1} - dM_n, formed directly rather than by differencing
+    dM_prev = np.concatenate((dM0 + np.zeros_like(dM[..., :1]), dM[..., :-1]), axis=-1)
+    return slope * dM_prev + B, dM
+
+
+def stream_tangents(blocks: Iterable[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+                    lam,
+                    rho,
+                    kernel="exp",
+                    kappa=1.0,
+                    M0=0.0) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """(n, a, M) blocks, e.g. from memory_weighted_blocks, extended to (n, a, M, da, dM)."""
+    accum = np.asarray(M0, dtype=float)
+    dM0 = np.zeros((len(PARAMS),) + accum.shape)
+    for n, a, M in blocks:
+        da, dM = tangent_block(n, a, M, accum, dM0, lam, rho, kernel, kappa, share=False)
+        accum = M[..., -1]
+        dM0 = dM[..., -1]
+        yield n, a, M, da, dM
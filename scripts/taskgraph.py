@@ -0,0 +1,218 @@
+import ast
+import hashlib
+import inspect
+import json
+import os
+import textwrap
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+import multiprocessing as mp
+from typing import Callable, Dict, List, Optional
+
+from .instrument import RunRecorder
+
+
+# A make-style graph over the files in figures/. A task is rebuilt only when
+# its outputs are missing or its stamp (parameters, code and input file
+# hashes) differs from the one saved after its last successful run.
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass
+class Task:
+    name: str
+    func: Callable[..., None]  # module-level, so it can be sent to a worker process
+    params: dict
+    outputs: List[str]
+    inputs: List[str] = field(default_factory=list)
+
+
+def _local_imports(tree: ast.AST) -> set:
+    # Sibling modules, imported as `from .mod import x` or `from . import mod`
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.level == 1:
+            if node.module:
+                names.add(node.module.split(".")[0])
+            else:
+                names.update(alias.name for alias in node.names)
+    return {n for n in names if os.path.exists(os.path.join(SCRIPTS_DIR, n + ".py"))}
+
+
+def code_version(func: Callable) -> str:
+    """Hash of func's source and of every local module it reaches through imports."""
+    own = os.path.splitext(os.path.basename(inspect.getsourcefile(func)))[0]
+    with open(inspect.getsourcefile(func), "rb") as f:
+        module = ast.parse(f.read())
+    # Only the function itself counts from its own module (plus the module's
+    # top-level imports), so editing one task body does not invalidate the
+    # others defined next to it
+    top = ast.Module(body=[n for n in module.body if isinstance(n, (ast.Import, ast.ImportFrom))],
+                     type_ignores=[])
+    todo = _local_imports(ast.parse(textwrap.dedent(inspect.getsource(func)))) | _local_imports(top)
+    sources = {own: inspect.getsource(func).encode()}
+    while todo:
+        name = todo.pop()
+        if name in sources:
+            continue
+        with open(os.path.join(SCRIPTS_DIR, name + ".py"), "rb") as f:
+            sources[name] = f.read()
+        todo |= _local_imports(ast.parse(sources[name]))
+    h = hashlib.sha1()
+    for name in sorted(sources):
+        h.update(name.encode())
+        h.update(sources[name])
+    return h.hexdigest()[:12]
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def fingerprint(task: Task) -> dict:
+    return {
+        "params": json.loads(json.dumps(task.params, sort_keys=True, default=str)),
+        "code": code_version(task.func),
+        "inputs": {p: _file_hash(p) for p in task.inputs},
+    }
+
+
+def _stamp_path(stamp_dir: str, task: Task) -> str:
+    return os.path.join(stamp_dir, task.name + ".json")
+
+
+def up_to_date(task: Task, stamp_dir: str, fp: dict) -> bool:
+    path = _stamp_path(stamp_dir, task)
+    if not os.path.exists(path) or not all(os.path.exists(p) for p in task.outputs):
+        return False
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f) == fp
+
+
+def _write_stamp(task: Task, stamp_dir: str, fp: dict):
+    os.makedirs(stamp_dir, exist_ok=True)
+    tmp = _stamp_path(stamp_dir, task) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(fp, f, indent=2, sort_keys=True)
+    os.replace(tmp, _stamp_path(stamp_dir, task))
+
+
+def _execute(task: Task, figdir: str):
+    for out in task.outputs:
+        os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with RunRecorder(task.name, task.params, outputs=task.outputs, figdir=figdir):
+        task.func(**task.params)
+
+
+def dependencies(tasks: List[Task]) -> Dict[str, List[str]]:
+    producer = {}
+    for t in tasks:
+        for out in t.outputs:
+            if out in producer:
+                raise ValueError(f"{out} is produced by both {producer[out]} and {t.name}")
+            producer[out] = t.name
+    return {t.name: sorted({producer[p] for p in t.inputs if p in producer}) for t in tasks}
+
+
+def select(tasks: List[Task], targets: Optional[List[str]] = None) -> List[Task]:
+    """Tasks needed for targets (task names or output paths), in definition order."""
+    if not targets:
+        return list(tasks)
+    by_name = {t.name: t for t in tasks}
+    by_output = {out: t.name for t in tasks for out in t.outputs}
+    deps = dependencies(tasks)
+    want = set()
+    todo = []
+    for target in targets:
+        name = target if target in by_name else by_output.get(os.path.normpath(target))
+        if name is None:
+            raise ValueError(f"unknown target {target!r}")
+        todo.append(name)
+    while todo:
+        name = todo.pop()
+        if name not in want:
+            want.add(name)
+            todo.extend(deps[name])
+    return [t for t in tasks if t.name in want]
+
+
+def run_graph(tasks: List[Task],
+              jobs: int = 1,
+              force: bool = False,
+              dry_run: bool = False,
+              figdir: str = "figures",
+              stamp_dir: Optional[str] = None) -> Dict[str, str]:
+    """Run tasks in dependency order, up to `jobs` at a time in spawned processes.
+
+    Returns name -> "skipped" (up to date), "ran", "failed", "blocked" (an
+    upstream task failed) or, with dry_run, "stale".
+    """
+    stamp_dir = stamp_dir or os.path.join(figdir, ".taskgraph")
+    deps = dependencies(tasks)
+    names = {t.name for t in tasks}
+    for t in tasks:
+        if any(d not in names for d in deps[t.name]):
+            raise ValueError(f"{t.name} depends on tasks that were not selected")
+    status = {}
+    pending = list(tasks)
+    running = {}
+    pool = None
+    if jobs > 1 and not dry_run:
+        pool = ProcessPoolExecutor(max_workers=jobs, mp_context=mp.get_context("spawn"))
+    try:
+        while pending or running:
+            ready = []
+            for t in list(pending):
+                upstream = [status.get(d) for d in deps[t.name]]
+                if any(s in ("failed", "blocked") for s in upstream):
+                    status[t.name] = "blocked"
+                    pending.remove(t)
+                elif all(s in ("skipped", "ran", "stale") for s in upstream):
+                    ready.append(t)
+                    pending.remove(t)
+            for t in ready:
+                stale_upstream = any(status[d] == "stale" for d in deps[t.name])
+                fp = None if stale_upstream else fingerprint(t)
+                if not force and fp is not None and up_to_date(t, stamp_dir, fp):
+                    status[t.name] = "skipped"
+                elif dry_run:
+                    status[t.name] = "stale"
+                elif pool is None:
+                    print({"task": t.name, "status": "running"}, flush=True)
+                    try:
+                        _execute(t, figdir)
+                    except Exception as exc:
+                        status[t.name] = "failed"
+                        print({"task": t.name, "status": "failed", "error": repr(exc)}, flush=True)
+                    else:
+                        _write_stamp(t, stamp_dir, fp)
+                        status[t.name] = "ran"
+                else:
+                    print({"task": t.name, "status": "running"}, flush=True)
+                    running[pool.submit(_execute, t, figdir)] = (t, fp)
+            if ready and not running:
+                continue
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                t, fp = running.pop(fut)
+                try:
+                    fut.result()
+                except Exception as exc:
+                    status[t.name] = "failed"
+                    print({"task": t.name, "status": "failed", "error": repr(exc)}, flush=True)
+                else:
+                    _write_stamp(t, stamp_dir, fp)
+                    status[t.name] = "ran"
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    for t in pending:
+        # Only reachable through a dependency cycle
+        status[t.name] = "blocked"
+    return status
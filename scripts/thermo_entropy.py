@@ -1,14 +1,25 @@
 import numpy as np
 
-
-def baseline_term(n: np.ndarray, alpha: float, beta: float) -> np.ndarray:
-    ln_n = np.log(n)
-    ln_n = np.where(ln_n == 0.0, np.finfo(float).tiny, ln_n)
-    return 1.0 / (np.power(n, alpha) * np.power(ln_n, beta))
-
-
-def f_memory(M: np.ndarray, lam: float, rho: float) -> np.ndarray:
-    return np.exp(-lam * np.power(M, rho))
+from .grid_tables import baseline_term
+from .recurrence import run_recurrence
+from .series_cache import cached_series
+
+
+def _entropy_segment(start: int,
+                     stop: int,
+                     alpha: float,
+                     beta: float,
+                     lam: float,
+                     rho: float,
+                     kB: float = 1.0,
+                     M0: float = 0.0,
+                     mode: str = "auto",
+                     share: bool = True) -> dict:
+    n = np.arange(start + 2, stop + 2, dtype=float)
+    b = baseline_term(n, alpha, beta, share=share)
+    a, M = run_recurrence(b, lam, rho, M0=M0, mode=mode)
+    # S = kB * cumsum(a), which is kB * M term for term and carries across segments
+    return {"delta_S": a * kB, "S": kB * M, "M": M}
 
 
 def entropy_series(N: int,
@@ -16,24 +27,23 @@ def entropy_series(N: int,
                    beta: float,
                    lam: float,
                    rho: float,
-                   kB: float = 1.0) -> dict:
+                   kB: float = 1.0,
+                   mode: str = "auto",
+                   cache: bool = False) -> dict:
     n = np.arange(2, N + 2, dtype=float)
-    b = baseline_term(n, alpha, beta)
-    a = np.empty_like(b)
-    M = np.empty_like(b)
-    accum = 0.0
-    for i in range(N):
-        fm = f_memory(np.array([accum]), lam, rho)[0]
-        ai = b[i] * fm
-        a[i] = ai
-        accum += ai
-        M[i] = accum
-    S = kB * np.cumsum(a)
+    if cache:
+        out = cached_series("entropy_series",
+                            {"alpha": alpha, "beta": beta, "lam": lam, "rho": rho, "kB": kB},
+                            N,
+                            lambda start, stop, M0: _entropy_segment(start, stop, alpha, beta, lam, rho,
+                                                                     kB, M0=M0, mode=mode, share=False))
+    else:
+        out = _entropy_segment(0, N, alpha, beta, lam, rho, kB, mode=mode)
     return {
         "n": n,
-        "delta_S": a * kB,
-        "S": S,
-        "M": M,
+        "delta_S": out["delta_S"],
+        "S": out["S"],
+        "M": out["M"],
     }
 
 
@@ -0,0 +1,205 @@
+import math
+import numpy as np
+from functools import partial
+
+from .continuum import integrate_tail
+from .grid_tables import baseline_term
+from .instrument import stage
+from .kernels import EXP, get_kernel
+from .recurrence import run_recurrence_batch
+from .result_store import store_path
+from .sweep_executor import run_sweep
+
+
+# Time to threshold: N_c is the smallest N such that the N-term series
+# reaches Phi_c, i.e. memory_weighted_series(N, ...)[2][-1] >= phi_c.
+
+
+def _continuum_crossing(M0: float, x0: int, x_end: int, phi_c: float,
+                        alpha: float, beta: float, lam: float, rho: float) -> dict:
+    # M(x) is the sum through term x - 3 (see continuum.hybrid_accumulate).
+    # Bracket the crossing on a doubling ladder of x, then bisect to an integer.
+    targets = []
+    x = x0
+    while x < x_end:
+        x = min(2 * x, x_end)
+        targets.append(x)
+    res = integrate_tail(M0, x0, targets, alpha, beta, lam, rho)
+    err = res["integration_err"] + res["truncation_err"]
+    i = next((i for i, v in enumerate(res["values"]) if v >= phi_c), None)
+    if i is None:
+        return {"x": None, "M": res["values"][-1], "err": err}
+    lo, M_lo = (targets[i - 1], res["values"][i - 1]) if i else (x0, M0)
+    hi, M_hi = targets[i], res["values"][i]
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        step = integrate_tail(M_lo, lo, [mid], alpha, beta, lam, rho)
+        if step["values"][0] >= phi_c:
+            hi, M_hi = mid, step["values"][0]
+        else:
+            lo, M_lo = mid, step["values"][0]
+            err += step["integration_err"] + step["truncation_err"]
+    return {"x": hi, "M": M_hi, "err": err}
+
+
+def time_to_threshold(alpha,
+                      beta,
+                      lam,
+                      rho,
+                      phi_c,
+                      n_max: int = 10**12,
+                      exact_max: int = 1 << 24,
+                      first_block: int = 4096,
+                      max_block: int = 1 << 18,
+                      budget: int = 1 << 22,
+                      mode: str = "auto",
+                      kernel="exp",
+                      kappa=1.0) -> dict:
+    """N_c for broadcast (alpha, beta, lam, rho, phi_c) arrays.
+
+    Configurations advance in lockstep through blocks that double from
+    first_block to max_block terms (capped at budget elements per block), and
+    each one leaves the batch in the block where it crosses phi_c. Those still
+    below it after exact_max terms are carried by the continuum tail
+    (continuum.py, 'exp' kernel only) up to n_max terms and the crossing is
+    bisected there; N_c_err then bounds the index error implied by the
+    tail's error estimate. Returns arrays N_c (NaN when phi_c is not reached
+    within the search), N_c_err, M_c (M at N_c, or at the last term searched),
+    searched (terms examined) and method ("exact", "continuum" or "unreached").
+    """
+    alpha, beta, lam, rho, phi_c, kappa = (np.ravel(x).astype(float) for x in
+                                           np.broadcast_arrays(alpha, beta, lam, rho, phi_c, kappa))
+    K = len(alpha)
+    if isinstance(kernel, (list, tuple, np.ndarray)):
+        if len(kernel) != K:
+            raise ValueError(f"got {len(kernel)} kernels for {K} configurations")
+        kernels = [get_kernel(k) for k in kernel]
+    else:
+        kernels = [get_kernel(kernel)] * K
+    N_c = np.full(K, np.nan)
+    N_c_err = np.zeros(K)
+    M_c = np.zeros(K)
+    searched = np.zeros(K, dtype=np.int64)
+    method = np.full(K, "unreached", dtype=object)
+    accum = np.zeros(K)
+    active = np.arange(K)
+    limit = min(exact_max, n_max)
+    start = 0
+    block = first_block
+    while active.size and start < limit:
+        L = min(block, max(first_block, budget // active.size), limit - start)
+        n = np.arange(start + 2, start + L + 2, dtype=float)
+        with stage("series", terms=active.size * L):
+            b = baseline_term(n[None, :], alpha[active, None], beta[active, None], share=False)
+            _, M = run_recurrence_batch(b, lam[active], rho[active], M0=accum[active], mode=mode,
+                                        kernel=[kernels[k] for k in active], kappa=kappa[active])
+        hit = M >= phi_c[active, None]
+        crossed = hit.any(axis=1)
+        first = hit.argmax(axis=1)
+        idx = active[crossed]
+        N_c[idx] = start + first[crossed] + 1
+        M_c[idx] = M[crossed, first[crossed]]
+        searched[idx] = N_c[idx]
+        method[idx] = "exact"
+        accum[active] = M[:, -1]
+        active = active[~crossed]
+        start += L
+        block = min(2 * block, max_block)
+    searched[active] = start
+    M_c[active] = accum[active]
+    if start < n_max:
+        with stage("continuum"):
+            for k in active:
+                if kernels[k].kind != EXP:
+                    continue
+                res = _continuum_crossing(accum[k], start + 2, n_max + 2, phi_c[k],
+                                          alpha[k], beta[k], lam[k], rho[k])
+                M_c[k] = res["M"]
+                if res["x"] is None:
+                    searched[k] = n_max
+                    continue
+                N_c[k] = searched[k] = res["x"] - 2
+                method[k] = "continuum"
+                # Increment at the crossing term (n = N_c + 1) converts the error in M to one in N
+                n = N_c[k] + 1
+                a_c = math.exp(-lam[k] * M_c[k] ** rho[k]) / (n ** alpha[k] * math.log(n) ** beta[k])
+                N_c_err[k] = res["err"] / a_c
+    return {"N_c": N_c, "N_c_err": N_c_err, "M_c": M_c, "searched": searched, "method": method}
+
+
+def threshold_points(points: list, mode: str = "auto", exact_max: int = 1 << 24) -> list:
+    """Chunk function for sweep_executor.run_sweep: one N_c row per point dict.
+
+    Points carry alpha, beta, lam, rho, phi_c and n_max, optionally kernel and kappa.
+    """
+    rows = [None] * len(points)
+    for n_max in sorted({p["n_max"] for p in points}):
+        idx = [i for i, p in enumerate(points) if p["n_max"] == n_max]
+        sub = [points[i] for i in idx]
+        res = time_to_threshold([p["alpha"] for p in sub],
+                                [p["beta"] for p in sub],
+                                [p["lam"] for p in sub],
+                                [p["rho"] for p in sub],
+                                [p["phi_c"] for p in sub],
+                                n_max=n_max,
+                                exact_max=exact_max,
+                                mode=mode,
+                                kernel=[p.get("kernel", "exp") for p in sub],
+                                kappa=[p.get("kappa", 1.0) for p in sub])
+        for j, i in enumerate(idx):
+            N_c = float(res["N_c"][j])
+            rows[i] = {**points[i],
+                       "N_c": N_c,
+                       "log10_N_c": math.log10(N_c) if N_c == N_c else math.nan,
+                       "N_c_err": float(res["N_c_err"][j]),
+                       "M_c": float(res["M_c"][j]),
+                       "searched": int(res["searched"][j]),
+                       "method": res["method"][j]}
+    return rows
+
+
+def sweep_threshold(phi_c: float = 4.0,
+                    n_max: int = 10**12,
+                    alpha_center: float = 1.0,
+                    beta_center: float = 1.0,
+                    delta: float = 0.02,
+                    steps: int = 9,
+                    lam: float = 1e-4,
+                    rho: float = 1.0,
+                    csv_path: str | None = "figures/threshold_sweep.csv",
+                    workers: int = 1,
+                    chunk_size: int | None = None,
+                    exact_max: int = 1 << 24) -> list:
+    """N_c(phi_c) over sweep_alpha_beta's (alpha, beta) grid.
+
+    The CSV has alpha and beta columns, so plot_critical_sweep.heatmap_from_csv
+    draws it directly (value column log10_N_c or N_c).
+    """
+    alphas = np.linspace(alpha_center - delta, alpha_center + delta, steps)
+    betas = np.linspace(beta_center - delta, beta_center + delta, steps)
+    points = [{"alpha": float(a), "beta": float(b), "lam": float(lam), "rho": float(rho),
+               "phi_c": float(phi_c), "n_max": int(n_max)}
+              for a in alphas
+              for b in betas]
+    return run_sweep(partial(threshold_points, exact_max=exact_max),
+                     points,
+                     csv_path=csv_path,
+                     workers=workers,
+                     chunk_size=chunk_size or steps,
+                     meta={"exact_max": exact_max},
+                     store_path=store_path(csv_path) if csv_path else None)
+
+
+if __name__ == "__main__":
+    import os
+    from .instrument import RunRecorder
+    from .plot_critical_sweep import heatmap_from_csv
+
+    params = {"phi_c": 4.0, "n_max": 10**12, "delta": 0.02, "steps": 9, "lam": 1e-4, "rho": 1.0,
+              "csv_path": "figures/threshold_sweep.csv", "workers": os.cpu_count() or 1}
+    out_png = "figures/threshold_heatmap_log10_N_c.png"
+    with RunRecorder("threshold", params, outputs=[params["csv_path"], store_path(params["csv_path"]), out_png]):
+        rows = sweep_threshold(**params)
+        heatmap_from_csv(store_path(params["csv_path"]), "log10_N_c", out_png)
+    for row in rows:
+        print(row)
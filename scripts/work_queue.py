@@ -0,0 +1,223 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import socket
+import threading
+import time
+from typing import Callable, List, Optional
+
+from .sweep_executor import write_csv
+
+
+# A sweep spread over any number of processes and hosts through a shared
+# directory:
+#
+#   task.pkl          the chunk function (pickled by reference, like a pool task)
+#   spec.json         chunk count, csv_path and the hash identifying the sweep
+#   chunks/<i>.json   the points of chunk i
+#   leases/<i>        held by the worker computing chunk i; its mtime is the heartbeat
+#   done/<i>.json     the rows of chunk i
+#
+# Every state change is an atomic create (O_EXCL), rename or replace, so the
+# queue needs no lock server and works on any shared filesystem with atomic
+# rename. A lease whose heartbeat is older than lease_s is re-issued to the
+# next worker that asks; a chunk may then run twice, which is harmless since
+# chunk functions are deterministic and done files are replaced whole.
+SPEC = "spec.json"
+
+
+def _name(i: int) -> str:
+    return f"{i:06d}"
+
+
+def _write_json(path: str, obj):
+    tmp = f"{path}.tmp-{socket.gethostname()}-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def submit(queue_dir: str,
+           func: Callable[[List[dict]], List[dict]],
+           points: List[dict],
+           chunk_size: int = 8,
+           csv_path: Optional[str] = None,
+           meta: Optional[dict] = None) -> dict:
+    """Write the chunks of a sweep into queue_dir; a no-op if the same sweep is already there.
+
+    Raises ValueError if queue_dir holds a different sweep.
+    """
+    chunks = [points[i:i + max(1, chunk_size)] for i in range(0, len(points), max(1, chunk_size))]
+    blob = pickle.dumps(func)
+    digest = hashlib.sha1(blob + json.dumps([chunks, meta or {}], sort_keys=True, default=str).encode())
+    spec = {"sweep": digest.hexdigest()[:16], "chunks": len(chunks), "points": len(points),
+            "csv_path": csv_path, "meta": meta or {}}
+    if not os.path.exists(os.path.join(queue_dir, SPEC)):
+        tmp = f"{queue_dir}.tmp-{socket.gethostname()}-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        for sub in ("chunks", "leases", "done"):
+            os.makedirs(os.path.join(tmp, sub))
+        with open(os.path.join(tmp, "task.pkl"), "wb") as f:
+            f.write(blob)
+        for i, chunk in enumerate(chunks):
+            _write_json(os.path.join(tmp, "chunks", _name(i) + ".json"), chunk)
+        _write_json(os.path.join(tmp, SPEC), spec)
+        os.makedirs(os.path.dirname(os.path.abspath(queue_dir)), exist_ok=True)
+        try:
+            os.rename(tmp, queue_dir)
+        except OSError:
+            # Someone else submitted first (or queue_dir is a leftover empty directory)
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.exists(os.path.join(queue_dir, SPEC)):
+                raise
+    current = _read_json(os.path.join(queue_dir, SPEC))
+    if current["sweep"] != spec["sweep"]:
+        raise ValueError(f"{queue_dir} holds a different sweep ({current['sweep']}, not {spec['sweep']})")
+    return current
+
+
+def _claim(queue_dir: str, i: int, worker: str, lease_s: float) -> Optional[str]:
+    lease = os.path.join(queue_dir, "leases", _name(i))
+    try:
+        if time.time() - os.path.getmtime(lease) < lease_s:
+            return None
+        # Expired: whoever renames it away first re-issues it
+        os.rename(lease, f"{lease}.expired-{worker}")
+        os.remove(f"{lease}.expired-{worker}")
+    except FileNotFoundError:
+        pass
+    try:
+        fd = os.open(lease, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return None
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"worker": worker, "claimed": time.time()}, f)
+    return lease
+
+
+def _heartbeat(lease: str, interval: float, stop: threading.Event):
+    while not stop.wait(interval):
+        try:
+            os.utime(lease)
+        except FileNotFoundError:
+            # Re-issued to someone else after a stall; finishing anyway is harmless
+            return
+
+
+def status(queue_dir: str, lease_s: float = 60.0) -> dict:
+    spec = _read_json(os.path.join(queue_dir, SPEC))
+    done = {f[:-5] for f in os.listdir(os.path.join(queue_dir, "done")) if f.endswith(".json")}
+    now = time.time()
+    running = expired = 0
+    for f in os.listdir(os.path.join(queue_dir, "leases")):
+        if f in done or "." in f:
+            continue
+        try:
+            fresh = now - os.path.getmtime(os.path.join(queue_dir, "leases", f)) < lease_s
+        except FileNotFoundError:
+            continue
+        running += fresh
+        expired += not fresh
+    return {"chunks": spec["chunks"], "done": len(done), "running": running, "expired": expired,
+            "pending": spec["chunks"] - len(done) - running - expired}
+
+
+def work(queue_dir: str,
+         worker: Optional[str] = None,
+         lease_s: float = 60.0,
+         poll: float = 1.0,
+         wait: bool = True) -> int:
+    """Claim and compute chunks until every chunk is done; returns how many this worker did.
+
+    With wait, a worker that finds only live leases keeps polling so it can
+    pick up chunks whose owners stop heartbeating; otherwise it returns.
+    """
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    spec = _read_json(os.path.join(queue_dir, SPEC))
+    with open(os.path.join(queue_dir, "task.pkl"), "rb") as f:
+        func = pickle.load(f)
+    count = 0
+    while True:
+        todo = [i for i in range(spec["chunks"])
+                if not os.path.exists(os.path.join(queue_dir, "done", _name(i) + ".json"))]
+        if not todo:
+            return count
+        claimed = False
+        for i in todo:
+            lease = _claim(queue_dir, i, worker, lease_s)
+            if lease is None:
+                continue
+            done = os.path.join(queue_dir, "done", _name(i) + ".json")
+            if os.path.exists(done):
+                os.remove(lease)
+                continue
+            claimed = True
+            stop = threading.Event()
+            beat = threading.Thread(target=_heartbeat, args=(lease, lease_s / 4, stop), daemon=True)
+            beat.start()
+            try:
+                rows = func(_read_json(os.path.join(queue_dir, "chunks", _name(i) + ".json")))
+                _write_json(done, rows)
+            finally:
+                stop.set()
+                beat.join()
+            try:
+                os.remove(lease)
+            except FileNotFoundError:
+                pass
+            count += 1
+        if not claimed:
+            if not wait:
+                return count
+            time.sleep(poll)
+
+
+def merge(queue_dir: str, csv_path: Optional[str] = None) -> List[dict]:
+    """Rows of a finished sweep in point order, written to csv_path (default: the one submitted)."""
+    spec = _read_json(os.path.join(queue_dir, SPEC))
+    missing = [i for i in range(spec["chunks"])
+               if not os.path.exists(os.path.join(queue_dir, "done", _name(i) + ".json"))]
+    if missing:
+        raise RuntimeError(f"{len(missing)} of {spec['chunks']} chunks in {queue_dir} are not done yet")
+    rows = []
+    for i in range(spec["chunks"]):
+        rows.extend(_read_json(os.path.join(queue_dir, "done", _name(i) + ".json")))
+    csv_path = csv_path or spec["csv_path"]
+    if csv_path:
+        write_csv(csv_path, rows)
+    return rows
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Work on, inspect or merge a sweep queue directory.")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    w = sub.add_parser("worker", help="claim and compute chunks until the sweep is done")
+    w.add_argument("queue_dir")
+    w.add_argument("--lease", type=float, default=60.0, help="seconds without a heartbeat before re-issue")
+    w.add_argument("--no-wait", action="store_true", help="exit when nothing is claimable")
+    s = sub.add_parser("status")
+    s.add_argument("queue_dir")
+    s.add_argument("--lease", type=float, default=60.0)
+    m = sub.add_parser("merge", help="write the CSV of a finished sweep")
+    m.add_argument("queue_dir")
+    m.add_argument("csv_path", nargs="?")
+    args = p.parse_args(argv)
+    if args.cmd == "worker":
+        print({"chunks_done": work(args.queue_dir, lease_s=args.lease, wait=not args.no_wait)})
+    elif args.cmd == "status":
+        print(status(args.queue_dir, args.lease))
+    else:
+        rows = merge(args.queue_dir, args.csv_path)
+        print({"rows": len(rows), "csv": args.csv_path or _read_json(os.path.join(args.queue_dir, SPEC))["csv_path"]})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import os
+import shutil
+
+from scripts.plot_critical_sweep import critical_heatmaps
+
+FIGURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "figures")
+
+
+def test_heatmaps_render_from_csv_without_store(tmp_path):
+    # A fresh checkout ships only the CSV, no critical_sweep.npz
+    shutil.copy(os.path.join(FIGURES, "critical_sweep.csv"), tmp_path)
+    saved = critical_heatmaps(str(tmp_path))
+    assert [os.path.basename(p) for p in saved] == ["critical_heatmap_windowed_growth.png",
+                                                    "critical_heatmap_tail_mean.png"]
+    assert all(os.path.getsize(p) > 0 for p in saved)
+    assert not os.path.exists(tmp_path / "critical_sweep.npz")